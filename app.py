@@ -0,0 +1,262 @@
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import pygame
+
+from display import Display
+from frame_pacing import FramePacer
+from chart import CHART_PATH
+from profiler import FrameProfiler
+from startup import StartupTrace
+from text_cache import font_cache
+from title_gui import GuiManager
+
+if TYPE_CHECKING:
+    from library import SongLibrary
+    from preload import SongLoader
+
+
+class App:
+    def __init__(self, refresh_rate: int = 60, vsync: bool = False, audio_mode: str = "stream",
+                 profile_path: Path = None, ghost_path: Path = None, fullscreen: bool = False,
+                 scale: str = "integer", trace: StartupTrace = None) -> None:
+        """
+        Initializes pygame, the window, the mixer and the clocks once for the whole time the game is open. The title
+        screen, gameplay and results screen all share them, so nothing is set up again between rounds.
+
+        Only the display is started before the title screen is shown. The system fonts are scanned in the background,
+        the mixer is opened once the first frame is shown and anything only needed once a game is played is imported
+        when it is first used.
+
+        :param refresh_rate: frames per second gameplay is drawn at, `None` for uncapped
+        :type refresh_rate: int (optional)
+        :param vsync: whether to sync frames to the monitor instead of sleeping between them
+        :type vsync: bool
+        :param audio_mode: how songs are loaded, "sound" to decode them up front or "stream" to stream them from memory
+        :type audio_mode: str
+        :param profile_path: if given, every frame is timed and the timings are written to this file when the game
+        closes, see `FrameProfiler.export`
+        :type profile_path: Path (optional)
+        :param ghost_path: if given, a replay that is played alongside every game of its song as a ghost
+        :type ghost_path: Path (optional)
+        :param fullscreen: whether to fill the screen rather than open a window
+        :type fullscreen: bool
+        :param scale: how the game is scaled up to the window's size, see `Display`
+        :type scale: str
+        :param trace: times each part of starting up, see `run.py --trace-startup`
+        :type trace: StartupTrace (optional)
+        """
+        self.__trace = trace if trace is not None else StartupTrace()
+        # the display brings the event queue with it, nothing else has to be started before the first frame
+        pygame.display.init()
+        self.__display = Display(fullscreen, scale, vsync)
+        self.__window = self.__display.get_surface()
+        pygame.display.set_caption('Rhythm Game')
+        self.__trace.mark("display")
+        self.__trace.run_in_background("fonts", font_cache.scan)
+
+        self.__clock = pygame.time.Clock()
+        # if vsync couldn't be turned on, frames are paced by sleeping instead
+        self.__pacer = FramePacer(refresh_rate, self.__display.is_vsynced())
+        self.__audio_mode = audio_mode
+        self.__profile_path = profile_path
+        self.__profiler = FrameProfiler(enabled=profile_path is not None)
+        self.__loader = None
+        # read when the first game or calibration needs it
+        self.__calibration_offset = None
+        self.__ghost_replay = None
+        if ghost_path is not None:
+            from replay import load_replay
+            self.__ghost_replay = load_replay(ghost_path)
+        from scores import ScoreStore
+        self.__scores = ScoreStore()
+        self.__trace.mark("settings")
+        # only the library's index is read at startup, songs are loaded when they're picked
+        from library import SongLibrary
+        self.__library = SongLibrary()
+        self.__library.scan()
+        self.__selected = self.__library.find_song(CHART_PATH / 'pulsar.chart')
+        self.__trace.mark("song library")
+
+    def run(self) -> None:
+        """
+        Runs the game, switching between the title screen and gameplay. Each scene runs until it hands over to the
+        next one, the title screen hands over to gameplay when space is pressed and gameplay hands back to the title
+        screen, with the round's results, when the song ends. Pressing C on the title screen goes to calibration, which
+        hands back to the title screen when it's done. Closing the window on the title screen quits.
+
+        The selected song is loaded in the background once the title screen is showing, and if another song is picked
+        that one is loaded instead. Every game is saved as a replay in
+        `Replays/` when it ends, and its score is saved in the high score store.
+        """
+        scene = "title"
+        stats = None
+        high_scores = None
+        self.__scores.start()
+        try:
+            while scene != "quit":
+                match scene:
+                    case "title":
+                        scene = GuiManager(self, stats, self.__loader, high_scores).gui_loop()
+                    case "game":
+                        # gameplay and replays are only needed once a game has been played
+                        from main import GameManager
+                        from replay import Ghost, Replay, save_replay
+                        self.start_mixer()
+                        # the title screen only starts the game once the picked song has loaded
+                        song = self.__loader.get_song()
+                        self.__loader = None
+                        ghost = None
+                        # the ghost only plays alongside the song it was recorded on
+                        if self.__ghost_replay is not None and \
+                                self.__ghost_replay.chart_hash == song.get_chart().chart_hash:
+                            ghost = Ghost(self.__ghost_replay, song.get_chart())
+                        game = GameManager(self, song, self.get_calibration_offset(), ghost=ghost)
+                        started = time.time()
+                        stats = game.game_loop()
+                        chart_hash = song.get_chart().chart_hash
+                        save_replay(Replay(chart_hash, self.get_calibration_offset(), game.get_presses(), stats[0]))
+                        # the session is saved in the background, the results screen shows the high scores once
+                        # they have been looked up
+                        self.__scores.record(chart_hash, stats, started, time.time())
+                        high_scores = self.__scores.query(chart_hash)
+                        scene = "title"
+                    case "calibration":
+                        from calibration import CalibrationScene
+                        self.start_mixer()
+                        scene = CalibrationScene(self).calibration_loop()
+        finally:
+            # closing the window during gameplay exits straight from the game loop, so this has to happen either way
+            if self.__profile_path is not None:
+                self.__profiler.export(self.__profile_path)
+            self.__scores.close()
+        pygame.quit()
+
+    def get_window(self) -> pygame.Surface:
+        """
+        Getter for the surface every scene is drawn on, which is the same size whatever the window's size.
+
+        :return: the surface.
+        """
+        return self.__window
+
+    def get_display(self) -> Display:
+        """
+        Getter for the display, which shows what has been drawn on the window's surface.
+
+        :return: the display.
+        """
+        return self.__display
+
+    def finish_startup(self) -> None:
+        """
+        Called by the title screen after each frame is shown. The first time, the startup trace is printed and the
+        mixer is opened.
+        """
+        self.__trace.finish()
+        self.start_mixer()
+
+    @staticmethod
+    def start_mixer() -> None:
+        """
+        Opens the mixer, unless it is already open. SDL's parts have to be started on the main thread, so rather than
+        being opened in the background it's left until the title screen is showing, or whatever needs it first.
+        """
+        if not pygame.mixer.get_init():
+            pygame.mixer.init()
+
+    def get_clock(self) -> pygame.time.Clock:
+        """
+        Getter for the clock used to run menus at a steady frame rate.
+
+        :return: the clock.
+        """
+        return self.__clock
+
+    def get_pacer(self) -> FramePacer:
+        """
+        Getter for the frame pacer used to draw gameplay at the chosen frame rate.
+
+        :return: the frame pacer.
+        """
+        return self.__pacer
+
+    def get_profiler(self) -> FrameProfiler:
+        """
+        Getter for the frame profiler every scene records its frame timings in.
+
+        :return: the frame profiler, which does nothing unless profiling was turned on.
+        """
+        return self.__profiler
+
+    def load_song(self, chart_path: Path) -> "SongLoader":
+        """
+        Starts loading a song in the background, unless it is already being loaded.
+
+        :param chart_path: file path of the song's chart
+        :type chart_path: Path
+        :return: the song's loader.
+        """
+        if self.__loader is None or self.__loader.get_source() != chart_path:
+            if self.__audio_mode == "sound":
+                # decoding a song into a sound needs the mixer's format
+                self.start_mixer()
+            from preload import SongLoader
+            self.__loader = SongLoader(chart_path, self.__audio_mode)
+            self.__loader.start()
+        return self.__loader
+
+    def get_library(self) -> "SongLibrary":
+        """
+        Getter for the library of every song that can be played.
+
+        :return: the library.
+        """
+        return self.__library
+
+    def get_selected(self) -> int:
+        """
+        Getter for the song selected on the song select screen.
+
+        :return: the song's position in the library.
+        """
+        return self.__selected
+
+    def select_song(self, selected: int) -> None:
+        """
+        Setter for the song selected on the song select screen, which stays selected for the next round.
+
+        :param selected: the song's position in the library
+        :type selected: int
+        """
+        self.__selected = selected
+
+    def get_selected_chart(self) -> Path:
+        """
+        Works out the chart of the selected song.
+
+        :return: file path of the chart, the default song's if the library is empty.
+        """
+        songs = self.__library.get_songs()
+        return songs[self.__selected].chart_path if songs else CHART_PATH / 'pulsar.chart'
+
+    def get_calibration_offset(self) -> float:
+        """
+        Getter for the calibration offset games are judged with, read from the saved calibration the first time.
+
+        :return: how late, in milliseconds, the player's presses land on this machine.
+        """
+        if self.__calibration_offset is None:
+            from calibration import load_calibration
+            self.__calibration_offset = load_calibration()["offset_ms"]
+        return self.__calibration_offset
+
+    def set_calibration_offset(self, offset_ms: float) -> None:
+        """
+        Setter for the calibration offset every game after this is judged with.
+
+        :param offset_ms: how late, in milliseconds, the player's presses land on this machine
+        :type offset_ms: float
+        """
+        self.__calibration_offset = offset_ms
@@ -0,0 +1,98 @@
+from collections import OrderedDict
+from pathlib import Path
+
+import pygame
+
+
+class AssetCache:
+    def __init__(self, max_bytes: int = None) -> None:
+        """
+        Initializes an empty cache of loaded and prescaled image surfaces, shared by everything that draws images.
+
+        :param max_bytes: optional cap on the total pixel memory held by the cache. When it is exceeded the least
+        recently used surfaces are evicted. `None` means the cache is unbounded
+        :type max_bytes: int (optional)
+        """
+        self.__surfaces = OrderedDict()
+        self.__max_bytes = max_bytes
+        self.__size = 0
+
+    def get_image(self, source: Path, scale: float = 1.0) -> pygame.Surface:
+        """
+        Returns the image at `source` scaled by `scale`, loading, converting and scaling it only the first time it is
+        asked for.
+
+        The display mode must already be set, as the surface is converted to the display's pixel format.
+
+        :param source: file path of the image
+        :type source: Path
+        :param scale: scaling factor applied to the width and height of the image
+        :type scale: float
+        :return: the cached surface, ready to be blitted.
+        """
+        key = (Path(source), scale)
+        surface = self.__surfaces.get(key)
+        if surface is not None:
+            # most recently used surfaces are kept at the end, so eviction pops from the front
+            self.__surfaces.move_to_end(key)
+            return surface
+
+        surface = pygame.image.load(source).convert_alpha()
+        if scale != 1.0:
+            surface = pygame.transform.scale(surface, (int(surface.get_width() * scale),
+                                                       int(surface.get_height() * scale)))
+        self.__surfaces[key] = surface
+        self.__size += self.__surface_bytes(surface)
+        self.__evict()
+        return surface
+
+    def set_max_bytes(self, max_bytes: int = None) -> None:
+        """
+        Changes the memory cap of the cache, evicting surfaces straight away if it is now over the cap.
+
+        :param max_bytes: new cap in bytes, or `None` to remove the cap
+        :type max_bytes: int (optional)
+        """
+        self.__max_bytes = max_bytes
+        self.__evict()
+
+    def clear(self) -> None:
+        """
+        Removes every surface from the cache.
+        """
+        self.__surfaces.clear()
+        self.__size = 0
+
+    def get_size(self) -> int:
+        """
+        Getter for the number of bytes of pixel data currently held by the cache.
+
+        :return: the cache size in bytes.
+        """
+        return self.__size
+
+    def __evict(self) -> None:
+        """
+        Evicts the least recently used surfaces until the cache fits under its cap. The most recently loaded surface
+        is always kept, even if on its own it is larger than the cap.
+        """
+        if self.__max_bytes is None:
+            return
+        while self.__size > self.__max_bytes and len(self.__surfaces) > 1:
+            _, surface = self.__surfaces.popitem(last=False)
+            self.__size -= self.__surface_bytes(surface)
+
+    @staticmethod
+    def __surface_bytes(surface: pygame.Surface) -> int:
+        """
+        Calculates how much pixel memory a surface uses.
+
+        :param surface: the surface to measure
+        :type surface: pygame.Surface
+        :return: the size of the surface's pixel data in bytes.
+        """
+        return surface.get_pitch() * surface.get_height()
+
+
+# process-wide cache, every scene shares the same loaded images
+asset_cache = AssetCache()
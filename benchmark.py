@@ -0,0 +1,165 @@
+import argparse
+import json
+import math
+import os
+import statistics
+import sys
+import time
+
+# the benchmarks run without a window or sound card
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+
+from app import App
+from chart import CHART_PATH, load_chart
+from lanes import LaneRenderer
+from main import GameManager, Score, Song
+from title_gui import UI_PATH, Box, GuiManager, Image
+
+# how much a timing can grow compared to the baseline before it counts as a regression
+THRESHOLD = 0.1
+# and how many microseconds it has to grow by too, a fraction of a very quick call is just noise
+MIN_DELTA_US = 0.5
+# calls made before anything is timed, so caches are warm and everything has been loaded
+WARMUP_CALLS = 20
+# each timing is of enough calls in a row to take at least this long, timing a single quick call mostly measures the
+# timer
+MIN_SAMPLE_NS = 200_000
+
+
+def measure(function, repeats: int) -> dict:
+    """
+    Times a function. After warming up, quick functions are called in batches long enough to time accurately, and
+    each timing is divided by the batch size.
+
+    :param function: the function to time, called with no arguments
+    :type function: Callable[[], None]
+    :param repeats: how many timings to take, at least 2
+    :type repeats: int
+    :return: the mean, median, 95th and 99th percentile time of one call in microseconds, the number of timings and
+    the calls in each one.
+    """
+    if repeats < 2:
+        raise ValueError("at least 2 timings are needed for percentiles")
+    for _ in range(WARMUP_CALLS):
+        function()
+    start = time.perf_counter_ns()
+    function()
+    batch = max(1, math.ceil(MIN_SAMPLE_NS / max(time.perf_counter_ns() - start, 1)))
+
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter_ns()
+        for _ in range(batch):
+            function()
+        timings.append((time.perf_counter_ns() - start) / 1000 / batch)
+    percentiles = statistics.quantiles(timings, n=100)
+    return {"mean": statistics.fmean(timings), "median": statistics.median(timings), "p95": percentiles[94],
+            "p99": percentiles[98], "count": repeats, "batch": batch}
+
+
+def run_benchmarks(repeats: int) -> dict:
+    """
+    Runs every benchmark.
+
+    :param repeats: how many timings are taken of each benchmark
+    :type repeats: int
+    :return: the results of each benchmark by name.
+    """
+    app = App(None)
+    window = app.get_window()
+    chart = load_chart(CHART_PATH / 'pulsar.chart')
+    results = {}
+
+    # gameplay frames, each one steps a 60th of a second of the song then draws it
+    game = GameManager(app, Song(chart, False))
+    frame_time = [0.0]
+
+    def game_frame() -> None:
+        frame_time[0] += 1000 / 60
+        game.step(frame_time[0])
+        game.draw(1.0)
+    results["game_loop_frame"] = measure(game_frame, repeats)
+
+    title = GuiManager(app, (4130, {"beats": 414, "good": 0, "perfect": 413}))
+    results["gui_loop_frame"] = measure(title.draw, repeats)
+
+    score = Score(window)
+    results["score_update"] = measure(lambda: score.update_score("perfect"), repeats)
+
+    image = Image(window, UI_PATH / 'press_space.png', 249, 10, 4)
+    results["image_draw"] = measure(image.draw, repeats)
+
+    lanes = LaneRenderer(window)
+    results["lanes_draw"] = measure(lanes.draw, repeats)
+
+    box = Box(window, 0, 0)
+    angle = [0]
+
+    def set_colour() -> None:
+        angle[0] += 1
+        box.set_colour(angle[0])
+    results["box_set_colour"] = measure(set_colour, repeats)
+
+    judged = GameManager(app, Song(chart, False))
+    results["player_in_beat"] = measure(lambda: judged.player_in_beat(1000), repeats)
+
+    results["song_construction"] = measure(lambda: Song(load_chart(CHART_PATH / 'pulsar.chart'), False), repeats)
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float = THRESHOLD, min_delta: float = MIN_DELTA_US) -> list:
+    """
+    Compares benchmark results against a baseline by their medians, which a few slow timings don't move.
+
+    :param results: the new results
+    :type results: dict
+    :param baseline: the results being compared against
+    :type baseline: dict
+    :param threshold: the fraction a timing can grow by before it counts as a regression
+    :type threshold: float
+    :param min_delta: how many microseconds a timing has to grow by as well
+    :type min_delta: float
+    :return: a description of every regression found.
+    """
+    regressions = []
+    for name, timings in results.items():
+        if "median" not in baseline.get(name, {}):
+            continue
+        old = baseline[name]["median"]
+        new = timings["median"]
+        if old > 0 and new > old * (1 + threshold) and new - old >= min_delta:
+            regressions.append(f"{name} median: {old:.2f}us -> {new:.2f}us (+{(new / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Times the game's per-frame hot paths")
+    parser.add_argument("--repeats", type=int, default=1000, help="how many timings are taken of each benchmark")
+    parser.add_argument("--output", help="file to write the results to as JSON, they are printed if not given")
+    parser.add_argument("--baseline", help="JSON results from an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="fraction a timing can grow by before it counts as a regression")
+    parser.add_argument("--min-delta", type=float, default=MIN_DELTA_US,
+                        help="microseconds a timing has to grow by as well before it counts as a regression")
+    args = parser.parse_args()
+    if args.repeats < 2:
+        parser.error("--repeats has to be at least 2")
+
+    benchmark_results = run_benchmarks(args.repeats)
+    pygame.quit()
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(benchmark_results, output, indent=2)
+    else:
+        print(json.dumps(benchmark_results, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            found = compare(benchmark_results, json.load(baseline_file), args.threshold, args.min_delta)
+        for regression in found:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        sys.exit(1 if found else 0)
@@ -0,0 +1,237 @@
+import json
+import math
+import statistics
+import time
+from array import array
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import pygame
+
+from input_capture import InputCapture
+from lanes import LaneRenderer
+from text_cache import CachedText, font_cache
+from timing import SongClock
+
+if TYPE_CHECKING:
+    from app import App
+
+# calibration is saved per machine, as the latency comes from the machine's sound hardware
+CONFIG_PATH = Path.home() / ".space_bass" / "calibration.json"
+
+# 120 clicks a minute
+CLICK_INTERVAL_MS = 500
+# clicks played before taps start counting, so the player can find the beat
+LEAD_IN_CLICKS = 4
+TAPPED_CLICKS = 16
+# the clicks are heard then seen, so the latency of the sound and of the screen are measured apart
+PHASES = ("audio", "visual")
+# how long the results stay on screen before going back to the title screen
+RESULTS_MS = 3000
+
+
+def load_calibration() -> dict:
+    """
+    Loads this machine's saved calibration.
+
+    :return: a dictionary with the player's mean offset to the clicks they heard, `offset_ms`, and how much their taps
+    varied, `jitter_ms`, then the same for the flashes they saw, `visual_offset_ms` and `visual_jitter_ms`. They are
+    all 0 if the machine hasn't been calibrated or the file can't be read.
+    """
+    try:
+        with open(CONFIG_PATH) as file:
+            calibration = json.load(file)
+        # calibrations saved before the flashes were timed only have the audio offset
+        return {"offset_ms": float(calibration["offset_ms"]), "jitter_ms": float(calibration["jitter_ms"]),
+                "visual_offset_ms": float(calibration.get("visual_offset_ms", 0.0)),
+                "visual_jitter_ms": float(calibration.get("visual_jitter_ms", 0.0))}
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        return {"offset_ms": 0.0, "jitter_ms": 0.0, "visual_offset_ms": 0.0, "visual_jitter_ms": 0.0}
+
+
+def save_calibration(audio: tuple, visual: tuple) -> None:
+    """
+    Saves this machine's calibration.
+
+    :param audio: how late, on average, the player tapped after each click they heard, negative if they tapped early,
+    the standard deviation of their taps and the number of taps, see `calculate_offset`
+    :type audio: tuple
+    :param visual: the same for each flash they saw
+    :type visual: tuple
+    """
+    CONFIG_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with open(CONFIG_PATH, "w") as file:
+        json.dump({"offset_ms": audio[0], "jitter_ms": audio[1], "taps": audio[2], "visual_offset_ms": visual[0],
+                   "visual_jitter_ms": visual[1], "visual_taps": visual[2], "calibrated": time.time()}, file)
+
+
+def calculate_offset(taps: list, clicks: list) -> tuple:
+    """
+    Works out how far the player's taps were from the clicks. Each tap is matched to its nearest click, taps more than
+    half a click away from any click are ignored.
+
+    :param taps: tap times in milliseconds
+    :type taps: list
+    :param clicks: click times in milliseconds
+    :type clicks: list
+    :return: a tuple of the mean offset and its standard deviation in milliseconds, and the number of taps used. The
+    offsets are `None` if no taps could be used.
+    """
+    offsets = []
+    for tap in taps:
+        nearest = min(clicks, key=lambda click: abs(tap - click))
+        if abs(tap - nearest) <= CLICK_INTERVAL_MS / 2:
+            offsets.append(tap - nearest)
+    if not offsets:
+        return None, None, 0
+    jitter = statistics.stdev(offsets) if len(offsets) > 1 else 0.0
+    return statistics.fmean(offsets), jitter, len(offsets)
+
+
+def make_click() -> pygame.mixer.Sound:
+    """
+    Generates a short metronome click, a sine wave that dies away quickly, in the mixer's format.
+
+    :return: the click sound.
+    """
+    frequency, _, channels = pygame.mixer.get_init()
+    samples = array("h")
+    for i in range(frequency // 20):
+        value = int(20000 * math.sin(2 * math.pi * 1000 * i / frequency) * math.exp(-i / (frequency / 200)))
+        samples.extend([value] * channels)
+    return pygame.mixer.Sound(buffer=samples.tobytes())
+
+
+class CalibrationScene:
+    def __init__(self, app: "App") -> None:
+        """
+        Sets up the calibration screen, which plays a metronome then flashes a beat and times the player's taps along
+        with each to measure the latency of their sound and of their screen, on top of their input's.
+
+        :param app: the app that owns the window and frame pacer
+        :type app: App
+        """
+        self.__app = app
+        self.__window = app.get_window()
+        self.__display = app.get_display()
+        self.__pacer = app.get_pacer()
+        self.__song_clock = SongClock(use_mixer=False)
+        self.__input = InputCapture(self.__song_clock)
+        self.__click = make_click()
+
+        # when each click is due, every phase has its own lead in
+        self.__clicks = [(i + 1) * CLICK_INTERVAL_MS for i in range((LEAD_IN_CLICKS + TAPPED_CLICKS) * len(PHASES))]
+        self.__next_click = 0
+        # when each click was actually played, or its flash shown, which can be a little after it was due
+        self.__cues = []
+        self.__flash_shown = True
+        self.__taps = []
+
+        self.__beat = LaneRenderer(self.__window, lane_count=1, x=self.__window.get_width() // 2 - 50)
+        font = font_cache.get_font("monospace", 24)
+        self.__instructions = {"audio": CachedText(font, "Tap space on each click ({} left)", (0, 0, 0)),
+                               "visual": CachedText(font, "Tap space each time it flashes ({} left)", (0, 0, 0))}
+        self.__results = {"audio": CachedText(font, "Audio  {:+4.0f}ms, jitter {:.0f}ms", (0, 0, 0)),
+                          "visual": CachedText(font, "Visual {:+4.0f}ms, jitter {:.0f}ms", (0, 0, 0))}
+        self.__failed = CachedText(font, "Not enough taps were close to the beat", (252, 73, 73))
+
+    def calibration_loop(self) -> str:
+        """
+        Plays the metronome and collects taps, then shows and saves the result.
+
+        :return: the scene to switch to, "title" when calibration is finished or "quit" if the window is closed.
+        """
+        self.__song_clock.start()
+        end_time = self.__clicks[-1] + CLICK_INTERVAL_MS
+        result = None
+        while True:
+            self.__poll()
+            for event in self.__input.get_events():
+                if event.type == pygame.QUIT:
+                    return "quit"
+            song_time = self.__song_clock.get_time()
+            self.__taps += self.__input.take_presses(song_time)
+            if self.__next_click and song_time - self.__clicks[self.__next_click - 1] > CLICK_INTERVAL_MS / 4:
+                self.__beat.set_inactive(0)
+
+            if result is None and song_time >= end_time:
+                result = self.__calculate_result()
+                if None not in (result[0][0], result[1][0]):
+                    save_calibration(*result)
+                    # the game's notes are played to the music, so presses are judged with the audio offset
+                    self.__app.set_calibration_offset(result[0][0])
+            if result is not None and song_time >= end_time + RESULTS_MS:
+                return "title"
+
+            self.__draw(result)
+            if not self.__flash_shown:
+                self.__cues.append(self.__song_clock.get_time())
+                self.__flash_shown = True
+            # taps are timed, and clicks played, while waiting for the next frame
+            self.__pacer.wait(self.__poll)
+
+    def __poll(self) -> None:
+        """
+        Takes input off the event queue and plays any click that is due, called every millisecond or so so the clicks
+        are heard on time rather than on the next frame. Flashes are only seen once the frame they are drawn in is
+        shown, so they are timed when it is.
+        """
+        self.__input.poll()
+        song_time = self.__song_clock.get_time()
+        while self.__next_click < len(self.__clicks) and song_time >= self.__clicks[self.__next_click]:
+            if self.__get_phase(self.__next_click) == "audio":
+                self.__click.play()
+                self.__cues.append(self.__song_clock.get_time())
+            else:
+                self.__beat.set_active(0)
+                self.__flash_shown = False
+            self.__next_click += 1
+
+    @staticmethod
+    def __get_phase(click: int) -> str:
+        """
+        Works out which phase a click is in.
+
+        :param click: the click's number
+        :type click: int
+        :return: one of `PHASES`.
+        """
+        return PHASES[min(click // (LEAD_IN_CLICKS + TAPPED_CLICKS), len(PHASES) - 1)]
+
+    def __calculate_result(self) -> tuple:
+        """
+        Works out the player's offset in each phase, from the taps along with its clicks after the lead in.
+
+        :return: a `calculate_offset` result for each of `PHASES`.
+        """
+        result = []
+        for phase in range(len(PHASES)):
+            first = phase * (LEAD_IN_CLICKS + TAPPED_CLICKS) + LEAD_IN_CLICKS
+            last = first + TAPPED_CLICKS - 1
+            # taps during the lead in don't count
+            start = self.__clicks[first] - CLICK_INTERVAL_MS / 2
+            end = self.__clicks[last] + CLICK_INTERVAL_MS / 2
+            taps = [tap for tap in self.__taps if start <= tap < end]
+            result.append(calculate_offset(taps, self.__cues[first:last + 1]))
+        return tuple(result)
+
+    def __draw(self, result: tuple) -> None:
+        """
+        Draws the flashing beat and either the instructions or the result.
+
+        :param result: the result of the calibration, `None` while it is still running
+        :type result: tuple (optional)
+        """
+        self.__window.fill((255, 255, 255))
+        self.__beat.draw()
+        if result is None:
+            phase = self.__get_phase(self.__next_click)
+            phase_start = PHASES.index(phase) * (LEAD_IN_CLICKS + TAPPED_CLICKS)
+            left = phase_start + LEAD_IN_CLICKS + TAPPED_CLICKS - max(self.__next_click, phase_start + LEAD_IN_CLICKS)
+            self.__instructions[phase].draw(self.__window, (150, 20), left)
+        elif None in (result[0][0], result[1][0]):
+            self.__failed.draw(self.__window, (130, 20))
+        else:
+            for line, (phase, (offset, jitter, _)) in enumerate(zip(PHASES, result)):
+                self.__results[phase].draw(self.__window, (200, 20 + line * 30), round(offset), round(jitter))
+        self.__display.present()
@@ -0,0 +1,250 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from pathlib import Path
+
+from timing import BPM
+
+AUDIO_PATH = Path("./Audio")
+CHART_PATH = Path("./Charts")
+# compiled charts are named after the hash of their source, so an edited chart is never loaded from a stale file
+COMPILED_PATH = CHART_PATH / ".compiled"
+# the game is always laid out with this many lanes
+LANE_COUNT = 9
+
+MAGIC = b"SBCH"
+VERSION = 1
+# magic, version, number of lanes, number of notes, length of the metadata, bpm, offset
+HEADER = struct.Struct("<4sHHIIdd")
+
+
+class Chart:
+    def __init__(self, metadata: dict, timestamps, lanes, lane_count: int, bpm: float, offset: float,
+                 chart_hash: str) -> None:
+        """
+        The function initializes a chart, the list of notes for a song with the time each one is reached and the beat it
+        is on.
+
+        :param metadata: the chart's header fields, such as its title and audio file
+        :type metadata: dict
+        :param timestamps: the time of each note in milliseconds from the start of the audio
+        :type timestamps: Sequence[float]
+        :param lanes: the beat number each note is on
+        :type lanes: Sequence[int]
+        :param lane_count: the number of beats across the screen
+        :type lane_count: int
+        :param bpm: number of note length units in a minute
+        :type bpm: float
+        :param offset: time in milliseconds from the start of the audio to the first note
+        :type offset: float
+        :param chart_hash: hash of the chart's source, which identifies the chart
+        :type chart_hash: str
+        """
+        self.metadata = metadata
+        self.timestamps = timestamps
+        self.lanes = lanes
+        self.lane_count = lane_count
+        self.bpm = bpm
+        self.offset = offset
+        self.chart_hash = chart_hash
+
+    def get_title(self) -> str:
+        """
+        Getter for the song's title.
+
+        :return: the title from the chart's header, or an empty string if it doesn't have one.
+        """
+        return self.metadata.get("title", "")
+
+    def get_audio(self) -> str:
+        """
+        Getter for the name of the song's audio file.
+
+        :return: the file name from the chart's header.
+        """
+        return self.metadata["audio"]
+
+
+# charts already loaded this session, by hash
+_loaded = {}
+
+
+def parse_chart_source(text: str) -> tuple:
+    """
+    Parses the text form of a chart. Lines of the form `key: value` are header fields and every other line is a list of
+    note lengths separated by spaces, anything after a `#` is a comment.
+
+    :param text: the chart's source
+    :type text: str
+    :return: a tuple of the header fields as a dictionary and the note lengths as a list.
+    """
+    metadata = {}
+    lengths = []
+    for line_number, line in enumerate(text.splitlines(), start=1):
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        if ":" in line:
+            key, value = line.split(":", 1)
+            metadata[key.strip()] = value.strip()
+            continue
+        for length in line.split():
+            if not length.isdigit() or int(length) < 1:
+                raise ValueError(f"line {line_number}: note length '{length}' is not a whole number of beats")
+            lengths.append(int(length))
+
+    if "audio" not in metadata:
+        raise ValueError("chart has no 'audio' field")
+    # a chart that can't be played is turned away as soon as it's read
+    read_header(metadata)
+    return metadata, lengths
+
+
+def read_header(metadata: dict) -> tuple:
+    """
+    Reads the header fields that change how a chart plays, using the defaults for any that aren't given, and checks
+    the game can play them.
+
+    :param metadata: the chart's header fields
+    :type metadata: dict
+    :return: a tuple of the bpm, the offset in milliseconds, the number of lanes and the lane the first note is on,
+    `None` for the middle one.
+    """
+    bpm = float(metadata.get("bpm", BPM))
+    offset = float(metadata.get("offset", 0))
+    lane_count = int(metadata.get("lanes", LANE_COUNT))
+    start = int(metadata["start"]) if "start" in metadata else None
+    # the notes' times are worked out from the bpm, they have to go forwards
+    if bpm <= 0:
+        raise ValueError(f"chart can't have a bpm of {metadata['bpm']}")
+    if lane_count != LANE_COUNT:
+        raise ValueError(f"chart can't have {lane_count} lanes, the game has {LANE_COUNT}")
+    if start is not None and not 0 <= start < lane_count:
+        raise ValueError(f"chart can't start on lane {start}, lanes go from 0 to {lane_count - 1}")
+    return bpm, offset, lane_count, start
+
+
+def calculate_lanes(lengths: list, lane_count: int = LANE_COUNT, start: int = None) -> list:
+    """
+    Calculates which beat each note is on. The player changes direction on every note, so every other note length is
+    counted to the left and the rest to the right, wrapping round the screen.
+
+    :param lengths: note lengths, in beats, from each note to the next
+    :type lengths: list
+    :param lane_count: the number of beats across the screen
+    :type lane_count: int
+    :param start: the beat the first note is on, defaults to the middle beat
+    :type start: int (optional)
+    :return: the beat number of every note, which is one longer than `lengths` as it includes the first note.
+    """
+    lanes = [lane_count // 2 if start is None else start]
+    for i, length in enumerate(lengths):
+        if i % 2 == 0:
+            lanes.append((lanes[i] - length) % lane_count)
+        else:
+            lanes.append((lanes[i] + length) % lane_count)
+    return lanes
+
+
+def compile_chart(text: str) -> bytes:
+    """
+    Compiles a chart's source into the binary form, the header followed by the chart's metadata as JSON, then the time
+    of every note as doubles and the beat of every note as bytes.
+
+    :param text: the chart's source
+    :type text: str
+    :return: the compiled chart.
+    """
+    metadata, lengths = parse_chart_source(text)
+    bpm, offset, lane_count, start = read_header(metadata)
+
+    unit_length = 60000 / bpm
+    timestamps = array("d", [offset])
+    for length in lengths:
+        timestamps.append(timestamps[-1] + length * unit_length)
+    lanes = array("B", calculate_lanes(lengths, lane_count, start))
+
+    encoded_metadata = json.dumps(metadata).encode()
+    # padding so the timestamps start on an 8 byte boundary
+    encoded_metadata += b" " * (-(HEADER.size + len(encoded_metadata)) % 8)
+    header = HEADER.pack(MAGIC, VERSION, lane_count, len(lanes), len(encoded_metadata), bpm, offset)
+    return header + encoded_metadata + timestamps.tobytes() + lanes.tobytes()
+
+
+def read_compiled_chart(data, chart_hash: str) -> Chart:
+    """
+    Reads a compiled chart, checking that it is complete. The notes are read straight out of `data` without copying.
+
+    :param data: the compiled chart, usually a memory map of the compiled file
+    :type data: bytes | mmap.mmap
+    :param chart_hash: hash of the chart's source
+    :type chart_hash: str
+    :return: the chart.
+    """
+    if len(data) < HEADER.size:
+        raise ValueError("compiled chart is too short")
+    magic, version, lane_count, note_count, metadata_length, bpm, offset = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("not a compiled chart, or compiled by a different version")
+    timestamps_start = HEADER.size + metadata_length
+    lanes_start = timestamps_start + note_count * 8
+    if len(data) != lanes_start + note_count:
+        raise ValueError("compiled chart is the wrong size")
+
+    view = memoryview(data)
+    metadata = json.loads(bytes(view[HEADER.size:timestamps_start]))
+    timestamps = view[timestamps_start:lanes_start].cast("d")
+    lanes = view[lanes_start:]
+    return Chart(metadata, timestamps, lanes, lane_count, bpm, offset, chart_hash)
+
+
+def load_chart(source: Path) -> Chart:
+    """
+    Loads a chart from its source file. The chart is compiled the first time it is loaded, after that the compiled file
+    is memory mapped, and charts that have already been loaded are reused.
+
+    :param source: file path of the chart's source
+    :type source: Path
+    :return: the chart.
+    """
+    text = Path(source).read_text()
+    chart_hash = hashlib.sha1(text.encode()).hexdigest()
+    if chart_hash in _loaded:
+        return _loaded[chart_hash]
+
+    compiled = COMPILED_PATH / f"{chart_hash}.chartc"
+    chart = None
+    if compiled.exists():
+        try:
+            with open(compiled, "rb") as file:
+                data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            chart = read_compiled_chart(data, chart_hash)
+        except (ValueError, OSError):
+            # a broken or outdated compiled file (an empty one can't even be mapped) is just compiled again
+            chart = None
+    if chart is None:
+        data = compile_chart(text)
+        try:
+            COMPILED_PATH.mkdir(parents=True, exist_ok=True)
+            # written next to the compiled file then moved over it, so it's never left half written
+            partial = compiled.with_suffix(".partial")
+            partial.write_bytes(data)
+            os.replace(partial, compiled)
+        except OSError:
+            # the chart still works if it can't be saved, it just gets compiled again next time
+            pass
+        chart = read_compiled_chart(data, chart_hash)
+
+    _loaded[chart_hash] = chart
+    return chart
+
+
+if __name__ == '__main__':
+    # compiles every chart given, e.g. `python chart.py Charts/*.chart`
+    for path in sys.argv[1:]:
+        loaded_chart = load_chart(Path(path))
+        print(f"{path}: {len(loaded_chart.lanes)} notes, {loaded_chart.chart_hash}")
@@ -0,0 +1,259 @@
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from chart import AUDIO_PATH, CHART_PATH, calculate_lanes
+from timing import BPM, MAX_SPEED
+from visualiser import read_wav, to_mono
+
+# the spectrum is worked out over windows of this many samples, every `HOP_SIZE` samples
+WINDOW_SIZE = 2048
+HOP_SIZE = 512
+# windows worked out at once, only this much of the song is read into memory at a time
+BLOCK_SIZE = 2048
+# tempos, in beats per minute, a song can be detected at, and the one that is preferred when it could be either
+MIN_TEMPO = 60
+MAX_TEMPO = 200
+PREFERRED_TEMPO = 120
+# an onset has to be the strongest this long either side of it, in seconds
+PEAK_SPACING = 0.1
+# how far above the average of the surrounding second an onset has to be, in standard deviations
+DEFAULT_SENSITIVITY = 0.5
+LENGTHS_PER_LINE = 16
+# how much of the song, in milliseconds, the beat grid is first fitted to
+FIT_START = 5000
+
+
+def spectral_flux(samples) -> np.ndarray:
+    """
+    Works out how suddenly the song's spectrum gets louder, every `HOP_SIZE` samples. Notes starting show up as peaks.
+    The song is read a block at a time.
+
+    :param samples: the song's samples, with a column for each channel
+    :type samples: numpy.ndarray
+    :return: the flux for each hop.
+    """
+    hop_count = max(len(samples) // HOP_SIZE, 1)
+    taper = np.hanning(WINDOW_SIZE).astype(np.float32)
+    flux = np.empty(hop_count, np.float32)
+    previous = None
+    for block in range(0, hop_count, BLOCK_SIZE):
+        hops = min(BLOCK_SIZE, hop_count - block)
+        start = block * HOP_SIZE
+        mono = to_mono(np.asarray(samples[start:start + (hops - 1) * HOP_SIZE + WINDOW_SIZE]))
+        # the last windows run off the end of the song
+        mono = np.pad(mono, (0, (hops - 1) * HOP_SIZE + WINDOW_SIZE - len(mono)))
+        windows = np.lib.stride_tricks.sliding_window_view(mono, WINDOW_SIZE)[::HOP_SIZE]
+        # loudness is heard on a log scale, so a quiet note starting counts as much as a loud one
+        spectrum = np.log1p(100 * np.abs(np.fft.rfft(windows * taper, axis=1)))
+        if previous is None:
+            previous = spectrum[:1]
+        change = np.diff(np.concatenate((previous, spectrum)), axis=0)
+        flux[block:block + hops] = np.maximum(change, 0).sum(axis=1)
+        previous = spectrum[-1:]
+    return flux
+
+
+def pick_onsets(flux: np.ndarray, hop_rate: float, sensitivity: float = DEFAULT_SENSITIVITY) -> np.ndarray:
+    """
+    Finds the peaks in the flux that stand out from their surroundings.
+
+    :param flux: the flux for each hop, from `spectral_flux`
+    :type flux: numpy.ndarray
+    :param hop_rate: hops per second
+    :type hop_rate: float
+    :param sensitivity: how far above the surrounding average a peak has to be, in standard deviations, lower finds
+    more onsets
+    :type sensitivity: float
+    :return: the hop of each onset.
+    """
+    spacing = max(int(PEAK_SPACING * hop_rate), 1)
+    surroundings = max(int(hop_rate), 1)
+    padded = np.pad(flux, spacing, mode="edge")
+    is_peak = flux >= np.lib.stride_tricks.sliding_window_view(padded, 2 * spacing + 1).max(axis=1)
+    # mirrored at each end, padding with silence would make the start and end look louder than they are
+    average = np.convolve(np.pad(flux, surroundings, mode="reflect"), np.ones(2 * surroundings + 1) / (2 * surroundings + 1),
+                          mode="valid")
+    threshold = average + sensitivity * flux.std()
+    return np.flatnonzero(is_peak & (flux > threshold))
+
+
+def estimate_tempo(flux: np.ndarray, hop_rate: float) -> float:
+    """
+    Estimates a song's tempo from how its flux repeats, preferring tempos near `PREFERRED_TEMPO` when the song could be
+    counted at half or double speed.
+
+    :param flux: the flux for each hop, from `spectral_flux`
+    :type flux: numpy.ndarray
+    :param hop_rate: hops per second
+    :type hop_rate: float
+    :return: the tempo in beats per minute.
+    """
+    centred = flux - flux.mean()
+    size = 1 << int(2 * len(centred) - 1).bit_length()
+    spectrum = np.fft.rfft(centred, size)
+    autocorrelation = np.fft.irfft(spectrum * np.conj(spectrum), size)[:len(centred)]
+
+    lags = np.arange(max(int(60 * hop_rate / MAX_TEMPO), 1), int(60 * hop_rate / MIN_TEMPO) + 1)
+    lags = lags[lags < len(autocorrelation)]
+    if len(lags) == 0:
+        return PREFERRED_TEMPO
+    tempos = 60 * hop_rate / lags
+    weights = np.exp(-0.5 * np.log2(tempos / PREFERRED_TEMPO) ** 2)
+    best = lags[np.argmax(autocorrelation[lags] * weights)]
+    # the autocorrelation's peak is between two lags, the parabola through its neighbours finds where
+    if 0 < best < len(autocorrelation) - 1:
+        before, peak, after = autocorrelation[best - 1:best + 2]
+        curvature = before - 2 * peak + after
+        if curvature < 0:
+            return 60 * hop_rate / (best + 0.5 * (before - after) / curvature)
+    return 60 * hop_rate / best
+
+
+def find_grid(flux: np.ndarray, hop_rate: float, unit_length: float) -> float:
+    """
+    Works out where the beat grid starts, by lining it up with the flux.
+
+    :param flux: the flux for each hop, from `spectral_flux`
+    :type flux: numpy.ndarray
+    :param hop_rate: hops per second
+    :type hop_rate: float
+    :param unit_length: the time between grid lines in milliseconds
+    :type unit_length: float
+    :return: the time of the first grid line in milliseconds.
+    """
+    unit_hops = unit_length * hop_rate / 1000
+    phases = np.arange(max(int(unit_hops), 1))
+    lines = np.arange(0, len(flux) - unit_hops, unit_hops)
+    scores = flux[(lines[None, :] + phases[:, None]).astype(np.int64)].sum(axis=1)
+    return phases[np.argmax(scores)] * 1000 / hop_rate
+
+
+def fit_grid(onsets: np.ndarray, offset: float, unit_length: float) -> tuple:
+    """
+    Fine tunes the beat grid so it lines up with the onsets across the whole song. A tempo that is only slightly off
+    drifts a long way from the song by the end of it, so the grid is fitted to the first few seconds, then to twice as
+    much of the song each time, with each fit used to work out which grid line the next onsets belong to.
+
+    :param onsets: onset times in milliseconds
+    :type onsets: numpy.ndarray
+    :param offset: the time of a grid line in milliseconds
+    :type offset: float
+    :param unit_length: the time between grid lines in milliseconds
+    :type unit_length: float
+    :return: the fitted grid's offset and time between grid lines, both in milliseconds.
+    """
+    if len(onsets) < 2:
+        return offset, unit_length
+    span = FIT_START
+    while True:
+        fitted = onsets[onsets <= onsets[0] + span]
+        lines = np.round((fitted - offset) / unit_length)
+        # onsets between grid lines, e.g. off beat notes, would pull the fit away from the beat
+        close = np.abs(fitted - offset - lines * unit_length) < unit_length / 4
+        if np.unique(lines[close]).size >= 2:
+            unit_length, offset = np.polyfit(lines[close], fitted[close], 1)
+        if onsets[0] + span >= onsets[-1]:
+            return float(offset), float(unit_length)
+        span *= 2
+
+
+def quantise(onsets: np.ndarray, offset: float, unit_length: float) -> list:
+    """
+    Snaps onsets to the beat grid and turns them into note lengths. Only one note can be on each grid line.
+
+    :param onsets: onset times in milliseconds
+    :type onsets: numpy.ndarray
+    :param offset: the time of the first grid line in milliseconds
+    :type offset: float
+    :param unit_length: the time between grid lines in milliseconds
+    :type unit_length: float
+    :return: the grid line of the first note, and the note lengths from each note to the next.
+    """
+    lines = np.unique(np.round((onsets - offset) / unit_length).astype(np.int64))
+    lines = lines[lines >= 0]
+    if len(lines) == 0:
+        return 0, []
+    return int(lines[0]), np.diff(lines).tolist()
+
+
+def generate_chart(audio_path: Path, tempo: float = None, sensitivity: float = DEFAULT_SENSITIVITY) -> tuple:
+    """
+    Charts a song from its audio. Every onset becomes a note, snapped to a grid of the song's beats split in half as
+    many times as the player's speed allows. Note lengths are whole numbers of grid lines, so the notes always
+    make the walk across the 9 beats, changing direction each note, that `calculate_lanes` works out.
+
+    :param audio_path: file path of the song's WAV file
+    :type audio_path: Path
+    :param tempo: the song's tempo in beats per minute, detected if not given
+    :type tempo: float (optional)
+    :param sensitivity: how far above the surrounding average an onset has to be, lower finds more notes
+    :type sensitivity: float
+    :return: the chart's source, the song's tempo and the number of notes.
+    """
+    if tempo is not None and tempo <= 0:
+        raise ValueError(f"a song can't have a tempo of {tempo}")
+    samples, sample_rate = read_wav(audio_path, mono=False)
+    hop_rate = sample_rate / HOP_SIZE
+    flux = spectral_flux(samples)
+    if tempo is None:
+        tempo = estimate_tempo(flux, hop_rate)
+
+    # the beat is split in half as many times as it can be without the player having to move faster than
+    # `MAX_SPEED` times their usual speed, so fast notes still get a grid line each
+    units_per_minute = tempo
+    while units_per_minute * 2 <= BPM * MAX_SPEED:
+        units_per_minute *= 2
+    while units_per_minute > BPM * MAX_SPEED:
+        units_per_minute /= 2
+    unit_length = 60000 / units_per_minute
+
+    # each onset is timed from the middle of its window
+    onsets = (pick_onsets(flux, hop_rate, sensitivity) * HOP_SIZE + WINDOW_SIZE / 2) * 1000 / sample_rate
+    grid_start, unit_length = fit_grid(onsets, find_grid(flux, hop_rate, unit_length), unit_length)
+    grid_start %= unit_length
+    # the fitted grid is a better measure of the tempo than the estimate it started from
+    tempo *= 60000 / unit_length / units_per_minute
+    units_per_minute = 60000 / unit_length
+    first_line, lengths = quantise(onsets, grid_start, unit_length)
+    offset = grid_start + first_line * unit_length
+    # checks the walk can be made, the same way loading the chart does
+    calculate_lanes(lengths)
+
+    lines = ["# Space Bass chart",
+             f"# generated from {audio_path.name} at {tempo:.2f} beats per minute",
+             "# each number is a note length, in beats, from one note to the next",
+             f"title: {audio_path.stem.replace('_', ' ').title()}",
+             f"audio: {audio_path.name}",
+             f"bpm: {units_per_minute:.4f}",
+             f"offset: {offset:.1f}",
+             "lanes: 9",
+             ""]
+    for start in range(0, len(lengths), LENGTHS_PER_LINE):
+        lines.append(" ".join(str(length) for length in lengths[start:start + LENGTHS_PER_LINE]))
+    return "\n".join(lines) + "\n", tempo, len(lengths) + 1
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generates charts for songs from their audio")
+    parser.add_argument("audio", nargs="+", type=Path, help="WAV files, looked for in Audio/ if not found")
+    parser.add_argument("--tempo", type=float, help="the song's tempo in beats per minute, detected if not given")
+    parser.add_argument("--sensitivity", type=float, default=DEFAULT_SENSITIVITY,
+                        help="how far above their surroundings onsets have to be, lower finds more notes")
+    parser.add_argument("--force", action="store_true", help="overwrite charts that already exist")
+    args = parser.parse_args()
+    if args.tempo is not None and args.tempo <= 0:
+        parser.error("--tempo has to be more than 0")
+
+    for audio in args.audio:
+        if not audio.exists():
+            audio = AUDIO_PATH / audio
+        chart_path = CHART_PATH / f"{audio.stem}.chart"
+        if chart_path.exists() and not args.force:
+            print(f"{chart_path} already exists, use --force to overwrite it", file=sys.stderr)
+            continue
+        source, detected_tempo, note_count = generate_chart(audio, args.tempo, args.sensitivity)
+        chart_path.write_text(source)
+        print(f"{audio} -> {chart_path}: {detected_tempo:.1f} bpm, {note_count} notes")
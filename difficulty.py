@@ -0,0 +1,180 @@
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from chart import CHART_PATH, parse_chart_source, read_header
+from timing import BPM, MAX_SPEED
+
+# notes this close together, in milliseconds, are part of a stream (4 notes a second or faster)
+STREAM_INTERVAL_MS = 60000 / BPM
+# how much further apart they can be and still count, charts' bpms are rounded so their notes aren't spaced exactly
+STREAM_TOLERANCE_MS = 0.5
+# the window the peak note density is measured over, in milliseconds
+DENSITY_WINDOW_MS = 1000
+# impossible notes listed for each chart in the report
+IMPOSSIBLE_SHOWN = 5
+
+
+def find_charts(sources: list) -> list:
+    """
+    Lists the chart files given, looking inside any folders.
+
+    :param sources: chart files and folders of charts
+    :type sources: list
+    :return: the charts' files.
+    """
+    paths = []
+    for source in sources:
+        paths += sorted(source.glob("*.chart")) if source.is_dir() else [source]
+    return paths
+
+
+def read_charts(paths: list) -> tuple:
+    """
+    Reads the note lengths and the header fields that affect how a chart plays from each chart's source.
+
+    :param paths: file paths of the charts
+    :type paths: list
+    :return: a tuple of the charts that could be read, as (path, bpm, lane count, note lengths) tuples, and the charts
+    that couldn't as (path, error) tuples.
+    """
+    charts = []
+    errors = []
+    for path in paths:
+        try:
+            metadata, lengths = parse_chart_source(path.read_text())
+            bpm, _, lane_count, _ = read_header(metadata)
+        except (OSError, ValueError) as error:
+            errors.append((path, str(error)))
+            continue
+        charts.append((path, bpm, lane_count, lengths))
+    return charts, errors
+
+
+def analyse_charts(charts: list) -> list:
+    """
+    Works out how hard every chart is in one go. The charts' note lengths are laid end to end in one array, each chart
+    followed by a gap longer than the density window, so every measurement is a single NumPy operation over the whole
+    batch and is split back into charts with `reduceat`.
+
+    The player walks from lane to lane, changing direction on every note, so each note length `n` moves the player
+    `n % lanes` lanes in `n` units of time. At the usual speed the player crosses a lane every `60000 / BPM`
+    milliseconds, a note is impossible if the player has to move more than `MAX_SPEED` times faster than that to reach
+    it.
+
+    :param charts: the charts, from `read_charts`
+    :type charts: list
+    :return: for each chart, in the same order, its note count, length in seconds, average and peak note density in
+    notes a second, longest stream in notes, direction changes a second, average lanes travelled a note, fastest speed
+    compared to usual, a rating combining them, and the notes that can't be reached in time.
+    """
+    if not charts:
+        return []
+    counts = np.array([len(lengths) for _, _, _, lengths in charts])
+    # each chart's note lengths then a 0 marking its end, so every element is the gap after the note at that index
+    elements = np.zeros(counts.sum() + len(charts), np.int64)
+    starts = np.concatenate(([0], np.cumsum(counts + 1)[:-1]))
+    for start, (_, _, _, lengths) in zip(starts, charts):
+        elements[start:start + len(lengths)] = lengths
+    chart_of = np.repeat(np.arange(len(charts)), counts + 1)
+    ends = elements == 0
+
+    unit_length = (60000 / np.array([bpm for _, bpm, _, _ in charts]))[chart_of]
+    intervals = elements * unit_length
+    travel = elements % np.array([lane_count for _, _, lane_count, _ in charts])[chart_of]
+    # how many times faster than usual the player has to move, 0 where the player doesn't move
+    speed = travel * (60000 / BPM) / np.where(ends, 1, intervals)
+
+    # the note times run on from one chart to the next, with the gap keeping the density windows apart
+    times = np.concatenate(([0], np.cumsum(np.where(ends, DENSITY_WINDOW_MS * 2, intervals))[:-1]))
+    in_window = np.searchsorted(times, times + DENSITY_WINDOW_MS) - np.arange(len(times))
+
+    # the number of fast gaps in a row up to each note, counted from the last slow gap
+    fast = ~ends & (intervals <= STREAM_INTERVAL_MS + STREAM_TOLERANCE_MS)
+    indices = np.arange(len(elements))
+    stream = indices - np.maximum.accumulate(np.where(fast, -1, indices))
+
+    # a direction change can be seen when the player moves both before and after the note
+    moving = travel > 0
+    changes = np.zeros(len(elements), bool)
+    changes[:-1] = moving[:-1] & moving[1:]
+
+    durations = np.maximum(np.add.reduceat(np.where(ends, 0, intervals), starts) / 1000, 1)
+    notes = counts + 1
+    mean_density = notes / durations
+    peak_density = np.maximum.reduceat(in_window, starts) * 1000 / DENSITY_WINDOW_MS
+    longest_stream = np.maximum.reduceat(stream, starts)
+    longest_stream = np.where(longest_stream > 0, longest_stream + 1, 0)
+    change_rate = np.add.reduceat(changes, starts) / durations
+    mean_travel = np.add.reduceat(travel, starts) / np.maximum(counts, 1)
+    mean_speed = np.add.reduceat(speed, starts) / np.maximum(counts, 1)
+    max_speed = np.maximum.reduceat(speed, starts)
+    # dense charts are harder the further the player has to move between notes
+    ratings = (mean_density + peak_density) / 2 * (0.5 + 0.5 * mean_speed) + change_rate / 4
+
+    impossible = {}
+    for index in np.flatnonzero(speed > MAX_SPEED):
+        chart = chart_of[index]
+        # the note that can't be reached is the one after the gap
+        impossible.setdefault(chart, []).append({"note": int(index - starts[chart] + 1),
+                                                 "time": float(times[index + 1] - times[starts[chart]]) / 1000,
+                                                 "speed": float(speed[index])})
+
+    return [{
+        "path": str(path),
+        "notes": int(notes[i]),
+        "duration": float(durations[i]),
+        "mean_density": float(mean_density[i]),
+        "peak_density": float(peak_density[i]),
+        "longest_stream": int(longest_stream[i]),
+        "direction_changes": float(change_rate[i]),
+        "mean_travel": float(mean_travel[i]),
+        "max_speed": float(max_speed[i]),
+        "rating": float(ratings[i]),
+        "impossible": impossible.get(i, []),
+    } for i, (path, _, _, _) in enumerate(charts)]
+
+
+def print_report(results: list, errors: list) -> None:
+    """
+    Prints the charts from hardest to easiest, with any notes that can't be reached in time.
+
+    :param results: the charts' difficulty, from `analyse_charts`
+    :type results: list
+    :param errors: the charts that couldn't be read, from `read_charts`
+    :type errors: list
+    """
+    ranked = sorted(results, key=lambda result: result["rating"], reverse=True)
+    print(f"{'':>3} {'rating':>6} {'notes/s':>7} {'peak':>5} {'stream':>6} {'turns/s':>7} {'lanes':>5} {'speed':>5}  chart")
+    for rank, result in enumerate(ranked, start=1):
+        print(f"{rank:>3} {result['rating']:6.2f} {result['mean_density']:7.2f} {result['peak_density']:5.0f} "
+              f"{result['longest_stream']:6} {result['direction_changes']:7.2f} {result['mean_travel']:5.2f} "
+              f"{result['max_speed']:4.2f}x  {result['path']}")
+        impossible = result["impossible"]
+        if impossible:
+            print(f"{'':>5}{len(impossible)} impossible notes, faster than {MAX_SPEED}x:")
+            for note in impossible[:IMPOSSIBLE_SHOWN]:
+                print(f"{'':>7}note {note['note']} at {note['time']:.2f}s needs {note['speed']:.2f}x")
+    for path, error in errors:
+        print(f"{path}: {error}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Rates how hard charts are and finds notes that can't be reached")
+    parser.add_argument("charts", nargs="*", type=Path, default=[CHART_PATH], help="chart files or folders")
+    parser.add_argument("--output", help="file to write every chart's measurements to as JSON")
+    args = parser.parse_args()
+
+    chart_sources, unreadable = read_charts(find_charts(args.charts))
+    chart_results = analyse_charts(chart_sources)
+    print_report(chart_results, unreadable)
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(chart_results, output, indent=2)
+    # fails if any chart can't be played, so it can be run before charts are shipped
+    if unreadable or any(result["impossible"] for result in chart_results):
+        sys.exit(1)
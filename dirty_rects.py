@@ -0,0 +1,77 @@
+import pygame
+
+
+class DirtyRects:
+    def __init__(self, window: pygame.Surface) -> None:
+        """
+        Initializes a tracker for the areas of the window that have changed since the last frame, so only those areas
+        are repainted and pushed to the display. Everything is dirty to begin with.
+
+        :param window: the surface being drawn on
+        :type window: pygame.Surface
+        """
+        self.__window = window
+        self.__rects = []
+        self.__everything = True
+
+    def add(self, *rects: pygame.Rect) -> None:
+        """
+        Marks areas of the window as changed.
+
+        :param rects: the areas that need repainting
+        """
+        if self.__everything:
+            return
+        window_rect = self.__window.get_rect()
+        for rect in rects:
+            rect = window_rect.clip(rect)
+            if rect.width and rect.height:
+                self.__rects.append(rect)
+
+    def add_everything(self) -> None:
+        """
+        Marks the whole window as changed, e.g. on the first frame or after the window has been covered up.
+        """
+        self.__everything = True
+        self.__rects.clear()
+
+    def repaint(self, draw) -> list:
+        """
+        Repaints every changed area by calling `draw` with the drawing clipped to that area, then forgets the changes.
+
+        :param draw: function that draws the whole scene, it only touches pixels inside the current clip
+        :type draw: Callable[[], None]
+        :return: the areas that were repainted, to pass on to `pygame.display.update`.
+        """
+        if self.__everything:
+            rects = [self.__window.get_rect()]
+        else:
+            rects = self.__merge(self.__rects)
+
+        for rect in rects:
+            self.__window.set_clip(rect)
+            draw()
+        self.__window.set_clip(None)
+
+        self.__rects = []
+        self.__everything = False
+        return rects
+
+    @staticmethod
+    def __merge(rects: list) -> list:
+        """
+        Combines overlapping areas, so nothing is repainted twice.
+
+        :param rects: the changed areas
+        :type rects: list
+        :return: areas that don't overlap each other and cover all of `rects`.
+        """
+        merged = []
+        for rect in rects:
+            # joining two areas can make the result overlap areas it didn't before, so keep going until nothing does
+            overlap = rect.collidelist(merged)
+            while overlap != -1:
+                rect = rect.union(merged.pop(overlap))
+                overlap = rect.collidelist(merged)
+            merged.append(rect)
+        return merged
@@ -0,0 +1,166 @@
+import math
+import os
+
+import pygame
+
+# everything is drawn at this size, then scaled up to fit the window
+LOGICAL_SIZE = (810, 500)
+# what SDL calls each scale mode, for when the scaling is done in hardware
+SCALE_QUALITY = {"integer": "nearest", "smooth": "linear"}
+
+
+class Display:
+    def __init__(self, fullscreen: bool = False, scale: str = "integer", vsync: bool = False) -> None:
+        """
+        Opens the game window. The game is always drawn on a surface of `LOGICAL_SIZE`, which is scaled to fit the
+        window in one go when it is presented, so the layout never changes with the window's size.
+
+        Where it can, SDL scales the surface on the graphics card (pygame's SCALED mode), fullscreen uses the desktop's
+        resolution and the window is as big as will fit at a whole number scale. Otherwise the surface is scaled in
+        software into a window of any size.
+
+        :param fullscreen: whether to fill the screen
+        :type fullscreen: bool
+        :param scale: "integer" to scale pixels up into blocks, with borders to make up the difference, or "smooth" to
+        fill as much of the window as possible with filtering
+        :type scale: str
+        :param vsync: whether the display update should wait for the monitor's vertical sync, only possible when the
+        scaling is done in hardware
+        :type vsync: bool
+        """
+        self.__scale = scale
+        self.__surface = None
+        self.__window = None
+        self.__window_size = None
+        self.__target = None
+        self.__vsync = False
+
+        # SDL reads the scale quality when the window's renderer is made, so this has to be set first
+        os.environ["SDL_RENDER_SCALE_QUALITY"] = SCALE_QUALITY[scale]
+        flags = pygame.SCALED | (pygame.FULLSCREEN if fullscreen else pygame.RESIZABLE)
+        for vsync_setting in (1, 0) if vsync else (0,):
+            try:
+                self.__surface = pygame.display.set_mode(LOGICAL_SIZE, flags, vsync=vsync_setting)
+                self.__vsync = vsync_setting == 1
+                break
+            except pygame.error:
+                continue
+
+        if self.__surface is None:
+            # no hardware scaling, the window is drawn to from an offscreen surface instead
+            if fullscreen:
+                self.__window = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
+            else:
+                self.__window = pygame.display.set_mode(LOGICAL_SIZE, pygame.RESIZABLE)
+            self.__surface = pygame.Surface(LOGICAL_SIZE).convert()
+            self.__layout()
+
+    def get_surface(self) -> pygame.Surface:
+        """
+        Getter for the surface everything is drawn on.
+
+        :return: the surface, always `LOGICAL_SIZE`.
+        """
+        return self.__surface
+
+    def is_vsynced(self) -> bool:
+        """
+        Checks if the display update waits for the monitor's vertical sync, it can't always be turned on when asked for.
+
+        :return: `True` if vsync is on.
+        """
+        return self.__vsync
+
+    def is_hardware_scaled(self) -> bool:
+        """
+        Checks if the surface is scaled to the window by SDL rather than in software.
+
+        :return: `True` if the scaling is done in hardware.
+        """
+        return self.__window is None
+
+    def present(self, rects: list = None) -> None:
+        """
+        Shows what has been drawn, scaled to fit the window.
+
+        :param rects: the areas of the surface that have changed, the whole surface is shown if not given
+        :type rects: list (optional)
+        """
+        if self.__window is None:
+            # SDL maps the areas to the window itself
+            if rects is None:
+                pygame.display.update()
+            else:
+                pygame.display.update(rects)
+            return
+
+        if self.__window.get_size() != self.__window_size:
+            # the window has been resized, the borders need clearing too
+            self.__layout()
+            rects = None
+
+        bounds = self.__surface.get_rect()
+        everything = rects is None
+        if everything:
+            rects = [bounds]
+        rects = [clipped for rect in rects if (clipped := pygame.Rect(rect).clip(bounds)).w and clipped.h]
+        if self.__scale == "integer" and self.__target.w % self.__surface.get_width() == 0:
+            # whole number scales map every pixel to a block of pixels, so just the areas that changed need scaling
+            window_rects = [self.__scale_area(rect) for rect in rects]
+        else:
+            # filtering blends neighbouring pixels, and shrinking doesn't line pixels up, so the whole surface is
+            # scaled once and only the areas that changed are pushed to the window
+            if self.__scale == "integer":
+                pygame.transform.scale(self.__surface, self.__target.size, self.__window.subsurface(self.__target))
+            else:
+                pygame.transform.smoothscale(self.__surface, self.__target.size,
+                                             self.__window.subsurface(self.__target))
+            window_rects = [self.to_window(rect).inflate(2, 2).clip(self.__target) for rect in rects]
+        if everything:
+            # the borders are pushed too
+            pygame.display.update()
+        else:
+            pygame.display.update(window_rects)
+
+    def to_window(self, rect: pygame.Rect) -> pygame.Rect:
+        """
+        Works out where an area of the surface is shown in the window.
+
+        :param rect: the area of the surface
+        :type rect: pygame.Rect
+        :return: the area of the window.
+        """
+        if self.__window is None:
+            return pygame.Rect(rect)
+        scale = self.__target.w / self.__surface.get_width()
+        left = math.floor(rect[0] * scale)
+        top = math.floor(rect[1] * scale)
+        right = math.ceil((rect[0] + rect[2]) * scale)
+        bottom = math.ceil((rect[1] + rect[3]) * scale)
+        return pygame.Rect(self.__target.x + left, self.__target.y + top, right - left, bottom - top)
+
+    def __layout(self) -> None:
+        """
+        Works out where the scaled surface goes in the window, centred with borders round it, and clears the borders.
+        """
+        self.__window_size = self.__window.get_size()
+        width, height = self.__surface.get_size()
+        scale = min(self.__window_size[0] / width, self.__window_size[1] / height)
+        if self.__scale == "integer" and scale >= 1:
+            scale = math.floor(scale)
+        size = (min(round(width * scale), self.__window_size[0]), min(round(height * scale), self.__window_size[1]))
+        self.__target = pygame.Rect((0, 0), size)
+        self.__target.center = (self.__window_size[0] // 2, self.__window_size[1] // 2)
+        self.__window.fill((0, 0, 0))
+
+    def __scale_area(self, rect: pygame.Rect) -> pygame.Rect:
+        """
+        Scales an area of the surface onto the window, only used at whole number scales.
+
+        :param rect: the area of the surface
+        :type rect: pygame.Rect
+        :return: the area of the window that was drawn on.
+        """
+        window_rect = self.to_window(rect)
+        pygame.transform.scale(self.__surface.subsurface(rect), window_rect.size, self.__window.subsurface(window_rect))
+        return window_rect
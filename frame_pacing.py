@@ -0,0 +1,92 @@
+import time
+
+# the game logic (input and hit judgement) always runs at this rate, however often frames are drawn
+UPDATE_RATE = 240
+# frame rates the game can be drawn at, `None` is uncapped
+REFRESH_RATES = (None, 60, 120, 144, 240)
+# how often input is checked while waiting for the next frame, in seconds
+POLL_INTERVAL = 0.001
+
+
+class FixedTimestep:
+    def __init__(self, update_rate: int = UPDATE_RATE, max_steps: int = 25) -> None:
+        """
+        Initializes a fixed timestep, which splits the time that has passed into equal length updates.
+
+        :param update_rate: number of updates per second
+        :type update_rate: int
+        :param max_steps: the most updates that will be run to catch up after a long frame, any time past that is
+        skipped so a stall can't snowball into longer and longer frames
+        :type max_steps: int
+        """
+        self.__step = 1000 / update_rate
+        self.__max_steps = max_steps
+        self.__time = 0.0
+        self.__now = 0.0
+
+    def advance(self, now: float):
+        """
+        Generates the times of every update that is due between the last update and `now`.
+
+        :param now: the current time in milliseconds
+        :type now: float
+        :return: a generator of update times in milliseconds.
+        """
+        self.__now = now
+        if now - self.__time > self.__step * self.__max_steps:
+            self.__time = now - self.__step * self.__max_steps
+        while self.__time + self.__step <= now:
+            self.__time += self.__step
+            yield self.__time
+
+    def get_alpha(self) -> float:
+        """
+        Calculates how far through the next update the current time is, used to interpolate between the last two
+        updates when drawing.
+
+        :return: a value between 0 and 1.
+        """
+        return min(max((self.__now - self.__time) / self.__step, 0.0), 1.0)
+
+
+class FramePacer:
+    def __init__(self, refresh_rate: int = 60, vsync: bool = False) -> None:
+        """
+        Initializes a frame pacer, which keeps frames at a steady rate by sleeping rather than spinning.
+
+        :param refresh_rate: frames per second to draw at, `None` for uncapped
+        :type refresh_rate: int (optional)
+        :param vsync: whether the display is synced to the monitor, in which case the display update already waits
+        for the next frame and the pacer doesn't need to
+        :type vsync: bool
+        """
+        self.__period = None if refresh_rate is None else 1 / refresh_rate
+        self.__vsync = vsync
+        self.__deadline = None
+
+    def wait(self, poll=None) -> None:
+        """
+        Sleeps until it is time for the next frame to be drawn.
+
+        :param poll: function to call every millisecond or so while waiting, e.g. to take input off the event queue
+        as soon as it arrives
+        :type poll: Callable[[], None] (optional)
+        """
+        if self.__period is None or self.__vsync:
+            if poll is not None:
+                poll()
+            return
+        now = time.perf_counter()
+        if self.__deadline is None or now - self.__deadline > self.__period:
+            # first frame, or the frame was so late that catching up would mean drawing frames back to back
+            self.__deadline = now
+        self.__deadline += self.__period
+        if poll is None:
+            delay = self.__deadline - now
+            if delay > 0:
+                time.sleep(delay)
+            return
+        # sleeping in short slices rather than one long sleep, the event queue can only be read from this thread
+        while (delay := self.__deadline - time.perf_counter()) > 0:
+            poll()
+            time.sleep(min(delay, POLL_INTERVAL))
@@ -0,0 +1,66 @@
+from collections import deque
+
+import pygame
+
+from timing import SongClock
+
+
+class InputCapture:
+    def __init__(self, clock: SongClock, key: int = pygame.K_SPACE, presses=None) -> None:
+        """
+        Initializes an input capture, which takes key presses from the event queue and stamps each one with the song's
+        time as soon as it is taken off the queue, so a press is judged at the time it happened rather than at the
+        time of the frame it was noticed in.
+
+        :param clock: the song clock presses are timed with
+        :type clock: SongClock
+        :param key: the key that is played with
+        :type key: int
+        :param presses: press times to play back, e.g. from a replay, instead of reading the key. The key is then
+        ignored
+        :type presses: Iterable[float] (optional)
+        """
+        self.__clock = clock
+        self.__key = None if presses is not None else key
+        self.__held = False
+        self.__presses = deque(presses if presses is not None else ())
+        self.__events = []
+
+    def poll(self) -> None:
+        """
+        Takes every event off the queue, timing the presses of the key. Any other events are kept for
+        `get_events`. Calling this more often than once a frame makes the press times more precise.
+        """
+        for event in pygame.event.get():
+            if event.type == pygame.KEYDOWN and event.key == self.__key:
+                # a held key can repeat, only the first key down counts as a press
+                if not self.__held:
+                    self.__held = True
+                    self.__presses.append(self.__clock.get_time())
+            elif event.type == pygame.KEYUP and event.key == self.__key:
+                self.__held = False
+            else:
+                self.__events.append(event)
+
+    def take_presses(self, song_time: float) -> list:
+        """
+        Removes the presses that happened up to a point in the song.
+
+        :param song_time: the time up to which presses are taken, in milliseconds
+        :type song_time: float
+        :return: the times of the presses, in order.
+        """
+        presses = []
+        while self.__presses and self.__presses[0] <= song_time:
+            presses.append(self.__presses.popleft())
+        return presses
+
+    def get_events(self) -> list:
+        """
+        Removes the events that weren't presses or releases of the key.
+
+        :return: the events, in the order they happened.
+        """
+        events = self.__events
+        self.__events = []
+        return events
@@ -0,0 +1,192 @@
+from array import array
+
+import pygame
+
+# what each lane is showing
+IDLE = 0
+ACTIVE = 1
+GOOD = 2
+PERFECT = 3
+MISS = 4
+STATE_COLOURS = {ACTIVE: (252, 222, 90), GOOD: (73, 252, 73), PERFECT: (73, 252, 252), MISS: (252, 73, 73)}
+
+# how many brightnesses the lanes have for the music's loudness, fewer means the lanes need redrawing less often
+LEVEL_STEPS = 8
+# how much brighter each step is, in each colour channel
+LEVEL_BRIGHTNESS = 8
+LANE_SPACING = 90
+LANE_WIDTH = 100
+
+# surfaces already baked this session, by colour, height and pixel format, shared by every lane and every game
+_baked = {}
+
+
+class LaneRenderer:
+    def __init__(self, window: pygame.Surface, lane_count: int = 9, x: int = 0) -> None:
+        """
+        Initializes the lanes (beats) the notes are on. Every colour a lane can be is baked into a surface up front,
+        and each lane's state is kept in an array rather than on an object of its own, so drawing every lane is a
+        single `Surface.blits` call however many lanes there are.
+
+        Each lane's idle colour is slightly different from the ones next to it, darker towards the edges, and is
+        brightened with the music by `set_level`. The other states are the same colour in every lane.
+
+        :param window: the surface the lanes are drawn on
+        :type window: pygame.Surface
+        :param lane_count: the number of lanes across the screen
+        :type lane_count: int
+        :param x: the x-coordinate of the first lane's left edge
+        :type x: int
+        """
+        self.__window = window
+        self.__rects = [pygame.Rect(x + lane * LANE_SPACING, 0, LANE_WIDTH, window.get_height())
+                        for lane in range(lane_count)]
+
+        self.__state_surfaces = [None] + [self.__bake(STATE_COLOURS[state]) for state in (ACTIVE, GOOD, PERFECT, MISS)]
+        self.__idle_surfaces = []
+        for lane in range(lane_count):
+            shift = abs(lane - (lane_count - 1) / 2) * 10
+            default = (80 + shift, 70 + shift, 70 + shift)
+            self.__idle_surfaces.append([self.__bake(tuple(min(int(channel) + step * LEVEL_BRIGHTNESS, 255)
+                                                           for channel in default)) for step in range(LEVEL_STEPS)])
+
+        self.__states = array("B", bytes(lane_count))
+        self.__levels = array("B", bytes(lane_count))
+        # what's blitted each frame, only changed when a lane's look does
+        self.__batch = [(self.__idle_surfaces[lane][0], rect.topleft) for lane, rect in enumerate(self.__rects)]
+        # every lane has to be drawn the first time
+        self.__changed = set(range(lane_count))
+
+    def set_active(self, lane: int) -> None:
+        """
+        Makes a lane the one with the next note on it, which turns it yellow.
+
+        :param lane: the lane's number
+        :type lane: int
+        """
+        self.__set_state(lane, ACTIVE)
+
+    def set_hit(self, lane: int, result: int) -> None:
+        """
+        Shows how well the active lane's note was hit. Only the first press for each note is shown.
+
+        :param lane: the lane's number
+        :type lane: int
+        :param result: `GOOD`, `PERFECT` or `MISS`
+        :type result: int
+        """
+        if self.__states[lane] == ACTIVE:
+            self.__set_state(lane, result)
+
+    def set_inactive(self, lane: int) -> None:
+        """
+        Puts a lane back to its idle colour.
+
+        :param lane: the lane's number
+        :type lane: int
+        """
+        self.__set_state(lane, IDLE)
+
+    def set_all_inactive(self) -> None:
+        """
+        Puts every lane back to its idle colour.
+        """
+        for lane in range(len(self.__states)):
+            self.__set_state(lane, IDLE)
+
+    def set_level(self, lane: int, level: int) -> None:
+        """
+        Brightens a lane with the loudness of the music, only seen while the lane is idle.
+
+        :param lane: the lane's number
+        :type lane: int
+        :param level: the loudness from 0 to 255
+        :type level: int
+        """
+        step = int(level) * LEVEL_STEPS // 256
+        if step == self.__levels[lane]:
+            return
+        self.__levels[lane] = step
+        if self.__states[lane] == IDLE:
+            self.__batch[lane] = (self.__idle_surfaces[lane][step], self.__rects[lane].topleft)
+            self.__changed.add(lane)
+
+    def is_active(self, lane: int) -> bool:
+        """
+        Checks if a lane is the active one and hasn't been hit yet.
+
+        :param lane: the lane's number
+        :type lane: int
+        :return: `True` if the lane is active.
+        """
+        return self.__states[lane] == ACTIVE
+
+    def get_lane_count(self) -> int:
+        """
+        Getter for the number of lanes.
+
+        :return: the number of lanes.
+        """
+        return len(self.__states)
+
+    def get_range(self, lane: int) -> tuple:
+        """
+        Getter for the x values a lane spans.
+
+        :param lane: the lane's number
+        :type lane: int
+        :return: the x-coordinates of the lane's left and right edges.
+        """
+        rect = self.__rects[lane]
+        return rect.left, rect.right
+
+    def take_changed_rects(self) -> list:
+        """
+        Gets the areas of the lanes that have changed colour since the last time this was called, meaning they need to
+        be redrawn.
+
+        :return: a list of `pygame.Rect`s.
+        """
+        rects = [self.__rects[lane] for lane in self.__changed]
+        self.__changed.clear()
+        return rects
+
+    def draw(self) -> None:
+        """
+        Draws every lane, in order so each lane overlaps the one to its left.
+        """
+        self.__window.blits(self.__batch, doreturn=False)
+
+    def __bake(self, colour: tuple) -> pygame.Surface:
+        """
+        Bakes a lane's surface in a colour, the first time it is needed.
+
+        :param colour: the colour (Red, Green, Blue)
+        :type colour: tuple
+        :return: the surface, the size of a lane.
+        """
+        key = (colour, self.__window.get_height(), self.__window.get_bitsize(), self.__window.get_masks())
+        surface = _baked.get(key)
+        if surface is None:
+            # made in the window's pixel format, so blitting it is a straight copy
+            surface = pygame.Surface((LANE_WIDTH, self.__window.get_height()), 0, self.__window)
+            surface.fill(colour)
+            _baked[key] = surface
+        return surface
+
+    def __set_state(self, lane: int, state: int) -> None:
+        """
+        Changes what a lane is showing, remembering that it needs to be redrawn if it looks different.
+
+        :param lane: the lane's number
+        :type lane: int
+        :param state: `IDLE`, `ACTIVE`, `GOOD`, `PERFECT` or `MISS`
+        :type state: int
+        """
+        if state == self.__states[lane]:
+            return
+        self.__states[lane] = state
+        surface = self.__idle_surfaces[lane][self.__levels[lane]] if state == IDLE else self.__state_surfaces[state]
+        if surface is not self.__batch[lane][0]:
+            self.__batch[lane] = (surface, self.__rects[lane].topleft)
+            self.__changed.add(lane)
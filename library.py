@@ -0,0 +1,194 @@
+import hashlib
+import json
+import wave
+from pathlib import Path
+
+from chart import AUDIO_PATH, CHART_PATH, COMPILED_PATH, parse_chart_source, read_header
+
+# the index is a cache like the compiled charts, so it lives with them
+INDEX_PATH = COMPILED_PATH / "library.json"
+INDEX_VERSION = 1
+
+
+class SongInfo:
+    def __init__(self, chart_path: Path, title: str, audio: str, duration: float, bpm: float, chart_hash: str,
+                 note_count: int, difficulty: float) -> None:
+        """
+        Initializes the details of a song shown on the song select screen, everything that can be known about a song
+        without loading it.
+
+        :param chart_path: file path of the song's chart
+        :type chart_path: Path
+        :param title: the song's title
+        :type title: str
+        :param audio: name of the song's audio file
+        :type audio: str
+        :param duration: length of the song in seconds
+        :type duration: float
+        :param bpm: number of note length units in a minute
+        :type bpm: float
+        :param chart_hash: hash of the chart's source, see `Chart.chart_hash`
+        :type chart_hash: str
+        :param note_count: number of notes in the chart
+        :type note_count: int
+        :param difficulty: how hard the chart is, the average number of notes a second
+        :type difficulty: float
+        """
+        self.chart_path = chart_path
+        self.title = title
+        self.audio = audio
+        self.duration = duration
+        self.bpm = bpm
+        self.chart_hash = chart_hash
+        self.note_count = note_count
+        self.difficulty = difficulty
+
+    def to_dict(self) -> dict:
+        """
+        Converts the details to a dictionary, to be saved in the index.
+
+        :return: the details.
+        """
+        return {"title": self.title, "audio": self.audio, "duration": self.duration, "bpm": self.bpm,
+                "chart_hash": self.chart_hash, "note_count": self.note_count, "difficulty": self.difficulty}
+
+    @classmethod
+    def from_dict(cls, chart_path: Path, details: dict) -> "SongInfo":
+        """
+        Reads the details back from the index.
+
+        :param chart_path: file path of the song's chart
+        :type chart_path: Path
+        :param details: the details, from `to_dict`
+        :type details: dict
+        :return: the song's details.
+        """
+        return cls(chart_path, details["title"], details["audio"], details["duration"], details["bpm"],
+                   details["chart_hash"], details["note_count"], details["difficulty"])
+
+
+def get_stamp(path: Path) -> list:
+    """
+    Works out a stamp that changes whenever a file does, without reading it.
+
+    :param path: file path
+    :type path: Path
+    :return: the file's modification time and size, or `None` if it doesn't exist.
+    """
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def read_duration(audio_path: Path) -> float:
+    """
+    Reads how long a song is from its WAV header, without reading the audio.
+
+    :param audio_path: file path of the song's audio
+    :type audio_path: Path
+    :return: the length in seconds, or `None` if it can't be read from the file.
+    """
+    try:
+        with wave.open(str(audio_path), "rb") as wav:
+            return wav.getnframes() / wav.getframerate()
+    except (OSError, EOFError, wave.Error):
+        return None
+
+
+def read_song_info(chart_path: Path) -> SongInfo:
+    """
+    Works out a song's details from its chart and the header of its audio file.
+
+    :param chart_path: file path of the song's chart
+    :type chart_path: Path
+    :return: the song's details.
+    """
+    text = chart_path.read_text()
+    metadata, lengths = parse_chart_source(text)
+    bpm, offset, _, _ = read_header(metadata)
+    last_note = (offset + sum(lengths) * 60000 / bpm) / 1000
+    # songs that aren't WAV files, or are missing, are as long as their chart
+    duration = read_duration(AUDIO_PATH / metadata["audio"]) or last_note
+    playing_time = max(last_note - offset / 1000, 1)
+    return SongInfo(chart_path, metadata.get("title", chart_path.stem), metadata["audio"], duration, bpm,
+                    hashlib.sha1(text.encode()).hexdigest(), len(lengths) + 1, round(len(lengths) / playing_time, 2))
+
+
+class SongLibrary:
+    def __init__(self, chart_path: Path = CHART_PATH, index_path: Path = INDEX_PATH) -> None:
+        """
+        Initializes the library of songs, one for each chart. The songs' details are kept in an index so the song select
+        screen never has to load a song, and only charts that have changed since the index was saved are read again.
+
+        :param chart_path: the folder the charts are in
+        :type chart_path: Path
+        :param index_path: file path of the index
+        :type index_path: Path
+        """
+        self.__chart_path = chart_path
+        self.__index_path = index_path
+        self.__songs = []
+
+    def scan(self) -> None:
+        """
+        Finds every chart and brings the index up to date. A chart is only read again if it or its audio file has been
+        modified or changed size since the index was saved.
+        """
+        try:
+            index = json.loads(self.__index_path.read_text())
+            if index.get("version") != INDEX_VERSION:
+                index = {}
+        except (OSError, ValueError):
+            index = {}
+        entries = index.get("songs", {})
+
+        songs = {}
+        changed = False
+        for chart_path in sorted(self.__chart_path.glob("*.chart")):
+            chart_stamp = get_stamp(chart_path)
+            entry = entries.get(chart_path.name)
+            if entry is not None and entry["chart_stamp"] == chart_stamp and \
+                    entry["audio_stamp"] == get_stamp(AUDIO_PATH / entry["details"]["audio"]):
+                songs[chart_path.name] = entry
+                continue
+            try:
+                info = read_song_info(chart_path)
+            except (OSError, ValueError, KeyError):
+                # a broken chart is left out, it's read again next time in case it has been fixed
+                continue
+            songs[chart_path.name] = {"chart_stamp": chart_stamp, "audio_stamp": get_stamp(AUDIO_PATH / info.audio),
+                                      "details": info.to_dict()}
+            changed = True
+
+        if changed or songs.keys() != entries.keys():
+            try:
+                self.__index_path.parent.mkdir(parents=True, exist_ok=True)
+                self.__index_path.write_text(json.dumps({"version": INDEX_VERSION, "songs": songs}))
+            except OSError:
+                # the library still works if the index can't be saved, it's just built again next time
+                pass
+        self.__songs = sorted((SongInfo.from_dict(self.__chart_path / name, entry["details"])
+                               for name, entry in songs.items()), key=lambda song: song.title.lower())
+
+    def get_songs(self) -> list:
+        """
+        Getter for every song in the library.
+
+        :return: the songs' details, sorted by title.
+        """
+        return self.__songs
+
+    def find_song(self, chart_path: Path) -> int:
+        """
+        Finds a song in the library by its chart.
+
+        :param chart_path: file path of the song's chart
+        :type chart_path: Path
+        :return: the song's position in `get_songs()`, or 0 if it isn't in the library.
+        """
+        for i, song in enumerate(self.__songs):
+            if song.chart_path == chart_path:
+                return i
+        return 0
@@ -1,125 +1,335 @@
 import sys
+from array import array
+from bisect import bisect_right
+from typing import TYPE_CHECKING
 
 import pygame
 from pygame.locals import QUIT
-from pathlib import Path
+
+from chart import AUDIO_PATH, CHART_PATH, Chart, load_chart
+from dirty_rects import DirtyRects
+from frame_pacing import FixedTimestep
+from input_capture import InputCapture
+from lanes import GOOD, MISS, PERFECT, LaneRenderer
+from profiler import OVERLAY_RECT
+from text_cache import CachedText, font_cache
+from timing import GOOD_WINDOW_MS, PERFECT_WINDOW_MS, SongClock
+from visualiser import BAND_COUNT, Envelope, load_envelope
+
+if TYPE_CHECKING:
+    from app import App
+    from replay import Ghost, Replay
 
 """
 Mintlify Doc Writer used to help write function docstrings
 https://writer.mintlify.com/
 """
 
-AUDIO_PATH = Path("./Audio")
+# where a ghost's score is shown, under the player's
+GHOST_POSITION = (0, 55)
 
 
 class GameManager:
-    def __init__(self) -> None:
-        """
-        Initializes a Pygame window, sets the caption, and initializes a clock, player, song, and beats.
-        """
-        # initialising pygame window
-        pygame.init()
-        self._window = pygame.display.set_mode((810, 500))
-        pygame.display.set_caption('Rhythm Game')
-        self.__clock = pygame.time.Clock()
-
-        # starts at 2 so 'press to start' doesn't cause the first beat to be failed
-        self.__space_pressed = 2
+    def __init__(self, app: "App", song: "Song" = None, calibration_offset: float = 0.0, playback: "Replay" = None,
+                 speed: float = 1.0, ghost: "Ghost" = None) -> None:
+        """
+        Initializes a clock, player, song, and beats, drawn on the app's window.
+
+        :param app: the app that owns the window and the frame pacer, which gameplay is drawn at the frame rate of. The
+        game logic runs at a fixed rate whatever that is
+        :type app: App
+        :param song: a song that has already been loaded, if not given the song is loaded from disk when it is played
+        :type song: Song (optional)
+        :param calibration_offset: how late, in milliseconds, the player's presses land on this machine, see
+        `calibration.py`. Presses are judged as if they happened this much earlier
+        :type calibration_offset: float
+        :param playback: a replay to play back instead of reading the keyboard, judged with the replay's calibration
+        :type playback: Replay (optional)
+        :param speed: how fast the song plays compared to real time, the song's audio is only played at normal speed
+        :type speed: float
+        :param ghost: an earlier run to play alongside this one, its score is shown under the player's
+        :type ghost: Ghost (optional)
+        """
+        self._window = app.get_window()
+        self.__display = app.get_display()
+        self.__offset = calibration_offset if playback is None else playback.offset_ms
+        self.__speed = speed
+        self.__ghost = ghost
+        self.__timestep = FixedTimestep()
+        self.__pacer = app.get_pacer()
+        self.__profiler = app.get_profiler()
 
         # loading song
         self.__player = Player(self._window)
-        self.__song = Song(AUDIO_PATH / 'pulsar.wav', False)
-        pygame.mixer.init()
-
-        # initialising beats, each beats default colour is slightly different
-        # from those adjacent to it
-        self.__beats = [Beat(self._window, x=i * 90, colour_shift=abs((i - 4)) * 10, active=False) for i in range(9)]
-
-        self.__active_beat = self.__beats[self.__song.get_next_note()]
-        self.__active_range = self.__active_beat.set_active()
-        self.__speed = 6
+        self.__song = song if song is not None else Song(load_chart(CHART_PATH / 'pulsar.chart'), False)
+        # a decoded sound can't report its position, so the song is timed with the system clock alone
+        self.__song_clock = SongClock(use_mixer=self.__song.is_streamed(), speed=speed)
+        # the press that started the game was taken by the title screen, so it can't fail the first beat
+        self.__input = InputCapture(self.__song_clock, presses=None if playback is None else playback.presses)
+        # every press is kept so the run can be saved as a replay
+        self.__presses = array("d")
+        # how each note was hit, 0 if it was missed, 1 for a good hit and 2 for a perfect one
+        self.__hits = array("B", bytes(self.__song.get_note_count()))
+
+        # the beats, each beats default colour is slightly different from those adjacent to it
+        self.__lanes = LaneRenderer(self._window)
+        self.__active_lane = self.__song.get_next_note()
+        self.__lanes.set_active(self.__active_lane)
+        # the beats light up with the music if the song has been analysed, see `visualiser.py`
+        self.__envelope = load_envelope(AUDIO_PATH / self.__song.get_chart().get_audio())
+
+        # only the parts of the window that change are repainted each frame
+        self.__dirty_rects = DirtyRects(self._window)
+        self.__player_rects = []
+        self.__overlay_shown = False
+        self.__shown_score = None
+        self.__score_rect = self.__player.score.get_score_rect()
+        self.__ghost_text = CachedText(font_cache.get_font("monospace", 30), "Ghost: {}", (150, 150, 150))
+        self.__shown_ghost_score = None
+        self.__ghost_rect = pygame.Rect(GHOST_POSITION, (0, 0))
 
     def game_loop(self) -> tuple:
         """
         The `game_loop` function is responsible for running the main game loop, updating the game state, handling player
         input, and updating the display.
-        """
-        self.__song.play()
-        while True:
-            self._window.fill((255, 255, 255))
-            for beat in self.__beats:
-                beat.draw_self()
-            self.__player.draw_self(self.__speed)
-            self.__player.score.update_score()
-
-            # holding space will only register as a press for the note it is first pressed for
-            keys = pygame.key.get_pressed()
-            if keys[pygame.K_SPACE] and not self.__space_pressed:
-                self.__space_pressed = 1
-            if not keys[pygame.K_SPACE]:
-                self.__space_pressed = 0
-
-            match self.player_in_beat():
-                # colour is set and score updated according to how well player matches space press with beat
-                case 0:
-                    if self.__space_pressed == 1:
-                        # `space_pressed` set to 2 to stop the press from registering for a different note as well
-                        self.__space_pressed = 2
-                        self.__active_beat.set_hit((252, 73, 73))
-                        self.__player.score.update_score("none")
-                case 1:
-                    if self.__space_pressed == 1:
-                        self.__space_pressed = 2
-                        self.__active_beat.set_hit((73, 252, 73))
-                        self.__player.score.update_score("good")
-                case 2:
-                    if self.__space_pressed == 1:
-                        self.__space_pressed = 2
-                        self.__active_beat.set_hit((73, 252, 252))
-                        self.__player.score.update_score("perfect")
-                case 3:
-                    self.__active_beat.set_hit((252, 73, 73))
-                    self.__player.score.update_score("next")
-                    self.__player.change_direction()
-                    self.__player.allow_direction_change()
-                    self.__active_beat.set_inactive()
-
-                    # selecting the next active note
-                    next_index = self.__song.get_next_note()
-                    if next_index == -1:
-                        break
-                    self.__active_beat = self.__beats[next_index]
-                    self.__active_range = self.__active_beat.set_active()
-                    self.__player.score.unlock_score_update()
-
-            for event in pygame.event.get():
-                if event.type == QUIT:
-                    pygame.quit()
-                    sys.exit()
-            pygame.display.update()
-
-            # running at 60 fps
-            self.__clock.tick_busy_loop(60)
+
+        The game state is updated in fixed steps for however much time has passed since the last frame, then drawn once,
+        interpolating between the last two steps.
+        """
+        if self.__speed == 1:
+            self.__song.play()
+        self.__song_clock.start()
+        playing = True
+        while playing:
+            self.__profiler.begin_frame()
+            self.__handle_events()
+            self.__profiler.mark("input")
+
+            for step_time in self.__timestep.advance(self.__song_clock.get_time()):
+                if not self.step(step_time, self.__input.take_presses(step_time)):
+                    playing = False
+                    break
+            self.__profiler.mark("judgement")
+
+            self.__visualise(self.__song_clock.get_time())
+            self.draw(self.__timestep.get_alpha())
+            # presses are picked up while waiting for the next frame too, so they are timed more precisely
+            self.__pacer.wait(self.__input.poll)
+            self.__profiler.mark("tick")
+            self.__profiler.end_frame()
 
         # time at end of song where there are no beats
         # stops player from pressing space, so they don't miss the title screen
-        for _ in range(300):
-            self._window.fill((255, 255, 255))
-            for beat in self.__beats:
-                beat.set_inactive()
-                beat.draw_self()
-            self.__player.draw_self(self.__speed)
-            self.__player.score.update_score()
-            pygame.display.update()
-            self.__clock.tick(60)
+        self.__lanes.set_all_inactive()
+        end_time = self.__song_clock.get_time() + 5000
+        while (song_time := self.__song_clock.get_time()) < end_time:
+            self.__profiler.begin_frame()
+            self.__handle_events()
+            self.__profiler.mark("input")
+
+            for step_time in self.__timestep.advance(song_time):
+                self.__move_player(step_time)
+            self.__profiler.mark("judgement")
+
+            self.__visualise(song_time)
+            self.draw(self.__timestep.get_alpha())
+            self.__pacer.wait(self.__input.poll)
+            self.__profiler.mark("tick")
+            self.__profiler.end_frame()
 
         return self.__player.score.get_stats()
 
-    def player_in_beat(self) -> int:
+    def step(self, song_time: float, presses: list = ()) -> bool:
+        """
+        Runs one step of the game, judging any presses of the space bar, passing notes the player has reached and
+        moving the player. Nothing is drawn, so the game can also be stepped without a display, see `simulation.py`.
+
+        :param song_time: the time of the step in milliseconds from the start of the song
+        :type song_time: float
+        :param presses: the times, in milliseconds from the start of the song, of any presses since the last step. Each
+        one is judged at the time it was pressed, not the time of the step
+        :type presses: list
+        :return: `False` once the last note has been passed, otherwise `True`.
+        """
+        # notes are judged on the player's calibrated time, but the player is still drawn where the song is
+        if self.__ghost is not None:
+            self.__ghost.advance(song_time)
+        for press_time in presses:
+            self.__presses.append(press_time)
+            if not self.__pass_notes(press_time - self.__offset):
+                return False
+            self.__judge_press(press_time - self.__offset)
+        if not self.__pass_notes(song_time - self.__offset):
+            return False
+        self.__move_player(song_time)
+        return True
+
+    def __judge_press(self, press_time: float) -> None:
+        """
+        Judges a press of the space bar against the active note. Only the first press for each note counts.
+
+        :param press_time: the time of the press in milliseconds from the start of the song
+        :type press_time: float
+        """
+        if not self.__lanes.is_active(self.__active_lane):
+            return
+        match self.player_in_beat(press_time):
+            # colour is set and score updated according to how well player matches space press with beat
+            case 0:
+                self.__lanes.set_hit(self.__active_lane, MISS)
+                self.__player.score.update_score("none")
+            case 1:
+                self.__lanes.set_hit(self.__active_lane, GOOD)
+                self.__player.score.update_score("good")
+                self.__hits[self.__song.get_note_index()] = 1
+            case 2:
+                self.__lanes.set_hit(self.__active_lane, PERFECT)
+                self.__player.score.update_score("perfect")
+                self.__hits[self.__song.get_note_index()] = 2
+
+    def __pass_notes(self, song_time: float) -> bool:
+        """
+        Moves on from the active note once the player has reached it, to the next note that hasn't been reached yet.
+
+        :param song_time: the current time in milliseconds from the start of the song
+        :type song_time: float
+        :return: `False` once the last note has been passed, otherwise `True`.
+        """
+        if self.player_in_beat(song_time) != 3:
+            return True
+        self.__lanes.set_inactive(self.__active_lane)
+
+        # selecting the next active note, a long frame can pass more than one note
+        # so every note that has been passed is counted
+        for _ in range(self.__song.skip_to(song_time)):
+            self.__player.score.update_score("next")
+        next_index = self.__song.get_note()
+        if next_index == -1:
+            return False
+        self.__active_lane = next_index
+        self.__lanes.set_active(next_index)
+        self.__player.score.unlock_score_update()
+        return True
+
+    def __visualise(self, song_time: float) -> None:
+        """
+        Lights the beats up with the music, bass in the middle and treble at the edges. The loudness of each frequency
+        band is looked up from the song's analysis, nothing is worked out while playing.
+
+        :param song_time: the current position in the song in milliseconds
+        :type song_time: float
+        """
+        if self.__envelope is None:
+            # a song's first time being loaded, it's analysed in the background and the beats stay still until then
+            self.__envelope = self.__song.get_envelope()
+            if self.__envelope is None:
+                return
+        levels = self.__envelope.get_levels(song_time)
+        for lane in range(self.__lanes.get_lane_count()):
+            # the first column is the overall loudness, the bands come after it
+            self.__lanes.set_level(lane, 0 if levels is None else levels[1 + min(abs(lane - 4), BAND_COUNT - 1)])
+
+    def draw(self, alpha: float) -> None:
+        """
+        Repaints the parts of the window that have changed since the last frame, the player, any beats that have
+        changed colour and the score if it has gone up, then updates just those parts of the display.
+
+        :param alpha: how far between the last two updates the frame is, used to place the player smoothly
+        :type alpha: float
+        """
+        # the player has to be cleared from where it was and drawn where it is now
+        player_rects = self.__player.interpolate(alpha)
+        self.__dirty_rects.add(*self.__player_rects, *player_rects)
+        self.__player_rects = player_rects
+
+        self.__dirty_rects.add(*self.__lanes.take_changed_rects())
+
+        score = self.__player.score.get_stats()[0]
+        if score != self.__shown_score:
+            # the new score text can be a different width to the old one
+            self.__dirty_rects.add(self.__score_rect, score_rect := self.__player.score.get_score_rect())
+            self.__score_rect = score_rect
+            self.__shown_score = score
+
+        if self.__ghost is not None and (ghost_score := self.__ghost.get_stats()[0]) != self.__shown_ghost_score:
+            self.__dirty_rects.add(self.__ghost_rect, ghost_rect := self.__ghost_text.get_surface(ghost_score).get_rect(
+                topleft=GHOST_POSITION))
+            self.__ghost_rect = ghost_rect
+            self.__shown_ghost_score = ghost_score
+
+        # the profiler's overlay is redrawn every frame, and its area has to be repainted once it is hidden
+        overlay_shown = self.__profiler.is_overlay_shown()
+        if overlay_shown or self.__overlay_shown:
+            self.__dirty_rects.add(OVERLAY_RECT)
+        self.__overlay_shown = overlay_shown
+
+        rects = self.__dirty_rects.repaint(self.__paint)
+        self.__profiler.draw_overlay(self._window)
+        self.__display.present(rects)
+        self.__profiler.mark("display")
+
+    def __paint(self) -> None:
+        """
+        Draws the beats, player and score. Only the area inside the window's clip is actually painted.
+        """
+        self._window.fill((255, 255, 255))
+        self.__profiler.mark("clear")
+        self.__lanes.draw()
+        self.__profiler.mark("beats")
+        self.__player.draw_interpolated()
+        self.__profiler.mark("player")
+        self.__player.score.write_score()
+        if self.__ghost is not None:
+            self.__ghost_text.draw(self._window, GHOST_POSITION, self.__ghost.get_stats()[0])
+        self.__profiler.mark("score")
+
+    def __handle_events(self) -> None:
         """
-        The function `player_in_beat` checks if the player's range is within the active range and returns a code based on
-        the direction and position of the player.
-        :return: a code based on the player's position and direction in relation to the active range.
+        Empties the event queue, closing the game if the window is closed, repainting everything if the window has
+        been covered up and showing or hiding the profiler's overlay when F3 is pressed.
+        """
+        self.__input.poll()
+        for event in self.__input.get_events():
+            if event.type == QUIT:
+                pygame.quit()
+                sys.exit()
+            elif event.type == pygame.WINDOWEXPOSED:
+                self.__dirty_rects.add_everything()
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                self.__profiler.toggle_overlay()
+
+    def get_score(self) -> "Score":
+        """
+        Getter for the player's score.
+
+        :return: the score.
+        """
+        return self.__player.score
+
+    def get_presses(self) -> array:
+        """
+        Getter for the times of every press judged so far, which is all a replay of the run needs.
+
+        :return: the press times in milliseconds from the start of the song, in order.
+        """
+        return self.__presses
+
+    def get_hits(self) -> array:
+        """
+        Getter for how each note has been hit so far.
+
+        :return: a value for every note in the song, 0 if it wasn't hit, 1 for a good hit and 2 for a perfect one.
+        """
+        return self.__hits
+
+    def player_in_beat(self, song_time: float) -> int:
+        """
+        The function `player_in_beat` checks how far the song is from the active note's time and returns a code based on
+        how close a press now would be to it.
+
+        :param song_time: the current position in the song in milliseconds
+        :type song_time: float
+        :return: a code based on the time left until the active note.
         The possible
         return values are:
         - 2: perfect score
@@ -127,27 +337,72 @@ class GameManager:
         - 0: no score
         - 3: player overshoot
         """
-        direction = self.__player.get_direction()
         # 2: perfect score, 1: partial score, 0: no score, 3: player overshoot
-        if direction == "right":
-            player_range = [x + self.__speed for x in self.__player.get_range()]
-            if player_range[1] >= self.__active_range[1] and player_range[1] - self.__active_range[1] <= 180:
-                return 3
-            elif player_range[0] <= self.__active_range[0] <= player_range[1]:
-                # if the player is close enough to hitting the beat perfectly, max score is given
-                if self.__active_range[1] - player_range[1] <= 30:
-                    return 2
-                return 1
-            return 0
-        elif direction == "left":
-            player_range = [x - self.__speed for x in self.__player.get_range()]
-            if player_range[0] <= self.__active_range[0] and self.__active_range[1] - player_range[1] <= 180:
-                return 3
-            elif player_range[0] <= self.__active_range[1] <= player_range[1]:
-                if player_range[0] - self.__active_range[0] <= 30:
-                    return 2
-                return 1
-            return 0
+        time_left = self.__song.get_note_time() - song_time
+        if time_left <= 0:
+            return 3
+        elif time_left <= PERFECT_WINDOW_MS:
+            return 2
+        elif time_left <= GOOD_WINDOW_MS:
+            return 1
+        return 0
+
+    def __move_player(self, song_time: float) -> None:
+        """
+        Moves the player to where it should be at the given point in the song. The player travels between the
+        positions it needs to be at for each note, so it reaches every beat exactly on its note's time whatever the
+        frame rate is.
+
+        :param song_time: the current position in the song in milliseconds
+        :type song_time: float
+        """
+        width = self._window.get_width()
+        next_note = self.__song.find_note(song_time)
+        if next_note == 0:
+            # waiting for the song to reach the first note
+            self.__player.set_position(self.__note_position(0), "right")
+            return
+
+        start_time = self.__song.get_note_time(next_note - 1)
+        start = self.__note_position(next_note - 1)
+        if next_note < self.__song.get_note_count():
+            direction = self.__note_direction(next_note)
+            end = self.__note_position(next_note)
+            distance = (end - start if direction == "right" else start - end) % width
+            travelled = distance * (song_time - start_time) / (self.__song.get_note_time(next_note) - start_time)
+        else:
+            # after the last note the player carries on at one beat per note length
+            direction = "left" if self.__note_direction(next_note - 1) == "right" else "right"
+            travelled = (song_time - start_time) * 90 / self.__song.get_unit_length()
+
+        x = start + travelled if direction == "right" else start - travelled
+        self.__player.set_position(x % width, direction)
+
+    def __note_position(self, index: int) -> float:
+        """
+        Calculates where the player has to be to reach a note. Moving right the player's right edge lines up with the
+        right edge of the beat, moving left their left edges line up.
+
+        :param index: index of the note in the song
+        :type index: int
+        :return: the player's x-coordinate when the note is reached.
+        """
+        beat_range = self.__lanes.get_range(self.__song.get_lane(index))
+        if self.__note_direction(index) == "right":
+            player_range = self.__player.get_range()
+            return beat_range[1] - (player_range[1] - player_range[0])
+        return beat_range[0]
+
+    @staticmethod
+    def __note_direction(index: int) -> str:
+        """
+        Works out which direction the player is moving in when it reaches a note, the direction changes every note.
+
+        :param index: index of the note in the song
+        :type index: int
+        :return: "right" or "left".
+        """
+        return "right" if index % 2 == 0 else "left"
 
 
 class Rectangle:
@@ -175,25 +430,22 @@ class Rectangle:
         self._width = width
         self._colour = colour
 
-    def draw_self(self, delta_x: int = 0, isPlayer: bool = False) -> None:
+    def get_rects(self, isPlayer: bool = False, x: float = None) -> list:
         """
-        The function draws a rectangle on a window and if the player is specified
+        The function returns the areas of the window the rectangle covers.
 
-        It also draws two additional rectangles for the player when they move off the screen
-        to create the illusion of seamless movement from one side to the other.
-
-        :param delta_x: amount the x value of the rectangle should change by between frames
-        :param isPlayer: boolean value that indicates whether the object being drawn is the player or not. If `isPlayer` is `True`, then the player object will appear to move seamlessly from one side of the screen to the other, defaults to False
+        :param isPlayer: boolean value that indicates whether the object is the player, in which case it also covers the two copies drawn either side of the screen, defaults to False
         :type isPlayer: bool (optional)
+        :param x: x-coordinate to use instead of the rectangle's own
+        :type x: float (optional)
+        :return: a list of `pygame.Rect`s.
         """
-        rect = pygame.Rect(self._x, self._y, self._width, self._height)
-        pygame.draw.rect(self._window, self._colour, rect)
-        if isPlayer:
-            # the player appears to move seamlessly from one side of the screen to the other
-            rect1 = pygame.Rect(self._x + self._window.get_width(), self._y, self._width, self._height)
-            rect2 = pygame.Rect(self._x - self._window.get_width(), self._y, self._width, self._height)
-            pygame.draw.rect(self._window, self._colour, rect1)
-            pygame.draw.rect(self._window, self._colour, rect2)
+        rect = pygame.Rect(self._x if x is None else x, self._y, self._width, self._height)
+        if not isPlayer:
+            return [rect]
+        # the player appears to move seamlessly from one side of the screen to the other
+        width = self._window.get_width()
+        return [rect, rect.move(width, 0), rect.move(-width, 0)]
 
     def get_range(self) -> tuple:
         """
@@ -212,113 +464,45 @@ class Player(Rectangle):
         :type window: pygame Surface
         """
         super().__init__(window, 426, window.get_height() // 2 - 25, 90, 90, (146, 99, 247))
+        self._previous_x = self._x
+        self._drawn_x = self._x
         self._direction = "right"
-        self._direction_change = True
         self.score = Score(window)
-        self.score.update_score()
-
-    def draw_self(self, delta_x: int = 0, isPlayer: bool = True) -> None:
-        """
-        The function updates the x-coordinate of an object, ensuring it stays within the window boundaries, and then calls a
-        superclass method to draw the object.
-
-        :param delta_x: represents the change in the x-coordinate of the object's position. It is used to calculate the new x-coordinate of the object after it moves, wraps around to 0 if it goes outside the screen width
-        :type delta_x: int (optional)
-        :param isPlayer: boolean value that indicates whether the object being drawn is the player or not. It is used to allow the player to seamlessly wrap from one side of the screen to the other, defaults to True
-        :type isPlayer: bool (optional)
-        """
-        self._x += self.__calculate_move(delta_x)
-        if self._x > self._window.get_width():
-            self._x -= self._window.get_width()
-        elif self._x < 0:
-            self._x += self._window.get_width()
-        super().draw_self(isPlayer)
 
-    def change_direction(self) -> None:
+    def set_position(self, x: float, direction: str) -> None:
         """
-        Changes the direction from "left" to "right" or vice versa.
-        """
-        if self._direction_change:
-            self._direction_change = False
-            self._direction = (lambda direction: "right" if direction == "left" else "left")(self._direction)
-
-    def get_direction(self) -> str:
-        """
-        Getter for direction attribute
-
-        :return: The direction of the object.
-        """
-        return self._direction
-
-    def disallow_direction_change(self) -> None:
-        """
-        Sets the __direction_change attribute to False if it is currently True.
-        """
-        if self._direction_change:
-            self._direction_change = False
-
-    def allow_direction_change(self) -> None:
-        """
-        Sets the __direction_change attribute to True if it is currently False.
-        """
-        if not self._direction_change:
-            self._direction_change = True
-
-    def __calculate_move(self, delta_x: int) -> int:
-        """
-        The function calculates if the move should be in positive or negative x based on the direction.
-
-        :param delta_x: represents the amount of movement in the x-direction.
-        :type delta_x: int
-        :return: The updated value of `delta_x` is being returned.
-        """
-        match self._direction:
-            case "right":
-                return delta_x
-            case "left":
-                return -delta_x
-
+        Moves the player straight to a position, used when the position is worked out from the song's time rather than
+        by moving a set amount each frame.
 
-class Beat(Rectangle):
-    def __init__(self, window: pygame.Surface, x: int, colour_shift: int, active: bool) -> None:
+        :param x: the new x-coordinate of the player
+        :type x: float
+        :param direction: the direction the player is moving in, "left" or "right"
+        :type direction: str
         """
-        The function initializes an object with a specified window, x-coordinate, color shift, and active status.
+        self._previous_x = self._x
+        self._x = x
+        self._direction = direction
 
-        :param window: the pygame surface on which the beat is to be drawn
-        :param x: the x-coordinate of the object's position on the window
-        :type x: int
-        :param colour_shift: used to adjust the RGB values of the `colour` attribute. It is added to each RGB value (red, green, and blue) to create a new color.
-        :type colour_shift: int
-        :param active: boolean value that determines whether the object is currently active or not. It is used to control the behavior or appearance of the object based on its active state
-        :type active: bool
+    def interpolate(self, alpha: float) -> list:
         """
-        colour = (80 + colour_shift, 70 + colour_shift, 70 + colour_shift)
-        super().__init__(window, x, 0, window.get_height(), 100, colour)
-        self._default_colour = self._colour
-        self._active = active
+        Places the player part of the way between its previous position and its current one, ready to be drawn.
 
-    def set_active(self) -> tuple:
+        :param alpha: how far between the two positions to place the player, from 0 to 1
+        :type alpha: float
+        :return: the areas of the window the player will cover when drawn.
         """
-        The function sets an object as active and changes its color to yellow.
-        :return: The method `get_range()` is being called and its return value is returned.
-        """
-        self._active = True
-        self._colour = (252, 222, 90)
-        return self.get_range()
+        width = self._window.get_width()
+        # moving the shortest way round, so the player doesn't jump across the screen when it wraps
+        change = (self._x - self._previous_x + width / 2) % width - width / 2
+        self._drawn_x = (self._previous_x + change * alpha) % width
+        return self.get_rects(True, self._drawn_x)
 
-    def set_hit(self, colour: tuple) -> None:
+    def draw_interpolated(self) -> None:
         """
-        The function sets the active status to false and assigns a specified color to the beat.
-
-        :param colour: the colour that will be set for the object
+        Draws the player where it was last placed by `interpolate`.
         """
-        if self._active:
-            self._active = False
-            self._colour = colour
-
-    def set_inactive(self):
-        self._active = False
-        self._colour = self._default_colour
+        for rect in self.get_rects(True, self._drawn_x):
+            pygame.draw.rect(self._window, self._colour, rect)
 
 
 class Score:
@@ -336,7 +520,7 @@ class Score:
         """
         self.__window = window
         # monospace is the best font dont @ me :3
-        self.__font = pygame.font.SysFont("monospace", size)
+        self.__font = font_cache.get_font("monospace", size)
         self.__score = score
         self.__allow_update = True
         self.__colour = (0, 0, 0)
@@ -345,6 +529,10 @@ class Score:
         else:
             self.__beat_stats = beat_stats
 
+        # text is only re-rendered when the numbers in it change
+        self.__score_text = CachedText(self.__font, "Score: {}", self.__colour)
+        self.__stats_text = CachedText(self.__font, "Hits:{}/{} Good: {} Perfect: {}", self.__colour)
+
     def write_beat_stats(self, position: tuple) -> None:
         """
         The function displays beat statistics on a given window surface.
@@ -353,10 +541,8 @@ class Score:
         :type position: tuple
         """
         hits = self.__beat_stats["good"] + self.__beat_stats["perfect"]
-        stats_surface = self.__font.render(
-            f"Hits:{hits}/{self.__beat_stats['beats']} Good: {self.__beat_stats['good']} Perfect: {self.__beat_stats['perfect']}",
-            True, self.__colour)
-        self.__window.blit(stats_surface, position)
+        self.__stats_text.draw(self.__window, position, hits, self.__beat_stats['beats'], self.__beat_stats['good'],
+                               self.__beat_stats['perfect'])
 
     def write_score(self, position: tuple = (0, 0)) -> None:
         """
@@ -365,9 +551,18 @@ class Score:
         :param position: the x and y coordinates to display the score
         :type position: tuple
         """
-        # score text has to be rendered every time it is updated
-        score_surface = self.__font.render(f"Score: {self.__score}", True, self.__colour)
-        self.__window.blit(score_surface, position)
+        # score text is only rendered again when the score has changed
+        self.__score_text.draw(self.__window, position, self.__score)
+
+    def get_score_rect(self, position: tuple = (0, 0)) -> pygame.Rect:
+        """
+        The function calculates the area the score text covers.
+
+        :param position: the x and y coordinates the score is displayed at
+        :type position: tuple
+        :return: a `pygame.Rect` covering the score text.
+        """
+        return self.__score_text.get_surface(self.__score).get_rect(topleft=position)
 
     def __increase_score(self, beat_success: str) -> None:
         """
@@ -393,7 +588,8 @@ class Score:
 
     def update_score(self, beat_success: str = "") -> None:
         """
-        The function updates the score by increasing it and then writes the updated score to the screen.
+        The function updates the score by increasing it. The score is drawn separately by `write_score`, only when the
+        part of the screen it is on needs repainting.
 
         :param beat_success: string that represents whether the beat was successful or not. It is used to determine whether to increase the score or not
         :type beat_success: str
@@ -401,7 +597,6 @@ class Score:
         if beat_success:
             self.__increase_score(beat_success)
             self.__update_stats(beat_success)
-        self.write_score()
 
     def __update_stats(self, hit: str = "") -> None:
         """
@@ -426,100 +621,28 @@ class Score:
 
 
 class Song:
-    def __init__(self, source: Path, playing: bool):
+    def __init__(self, chart: Chart, playing: bool, audio=None):
         """
-        The function initializes an object with a source, a sequence of note lengths, a playing status, and a current note
-        index.
+        The function initializes an object with a chart, a playing status, and a current note index. The chart has the
+        beat and time of every note in the song already calculated.
 
-        :param source: used to specify the source of the music. It could be a file path to a music file, a URL to a music stream, or any other valid source of music data
-        :type source: str
+        :param chart: the song's chart, which also names the song's audio file
+        :type chart: Chart
         :param playing: boolean value that indicates whether the song is currently playing or not. It is used to control the playback of the song
         :type playing: bool
-        """
-        self.__source = source
-        self.__sequence = [  # Song sequence in note length form
-            2, 2, 2, 2, 2, 2, 2, 2,
-            2, 2, 2, 2, 2, 2, 2, 2,
-
-            2, 2, 2, 2, 1, 1, 1, 2, 1, 1, 1,
-            2, 2, 2, 2, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1,
-            2, 2, 2, 2, 1, 1, 1, 2, 1, 1, 1,
-            2, 2, 2, 2, 1, 1, 1, 1, 1, 1, 1, 1, 1,
-            2, 2, 2, 2, 1, 1, 1, 2, 1, 1, 1,
-            2, 2, 2, 2, 1, 1, 1, 1, 1, 1, 1, 1, 1,
-
-            2, 2, 2, 2, 2, 1, 1, 2, 1, 1, 1,
-            2, 2, 2, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1,
-            2, 2, 2, 2, 1, 1, 1, 2, 1, 1, 1,
-            2, 2, 2, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1,
-            5, 1, 1, 6, 1, 1,
-            4, 4, 4, 5,
-            5, 1, 1, 6, 1, 1,
-            4, 4, 4, 5,
-
-            2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2,
-            2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2,
-
-            2, 2, 1, 1, 2,
-            2, 2, 1, 1, 2,
-            2, 2, 1, 1, 3,
-            2, 2, 1, 1, 1,
-
-            2, 2, 1, 1, 2,
-            2, 2, 1, 1, 2,
-            2, 2, 1, 1, 3,
-            2, 2, 1, 1, 1,
-
-            2, 2, 1, 1, 2,
-            2, 2, 1, 1, 2,
-            2, 2, 1, 1, 3,
-            2, 2, 1, 1, 1,
-
-            2, 2, 1, 1, 2,
-            2, 2, 1, 1, 2,
-            1, 1, 1, 1, 1, 1, 1, 1,
-            1, 1, 1, 1, 1, 1, 1, 1,
-
-            2, 2, 2, 2, 1, 1, 1, 2, 1, 1, 1,
-            2, 2, 2, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1,
-            2, 2, 2, 2, 1, 1, 1, 2, 1, 1, 1,
-            2, 2, 2, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1,
-            5, 1, 1, 6, 1, 1,
-            4, 4, 4, 5,
-            5, 1, 1, 6, 1, 1,
-            4, 4, 4, 1, 1, 1, 1, 1,
-
-            5, 1, 1, 6, 1, 1,
-            4, 4, 4, 5,
-            5, 1, 1, 6, 1, 1,
-            4, 4, 4, 5,
-
-            2, 2, 1, 1, 2,
-            2, 2, 1, 1, 2,
-            2, 2, 1, 1, 3,
-            2, 2, 1, 1, 1,
-
-            2, 2, 1, 1, 2,
-            2, 2, 1, 1, 2,
-            1, 1, 1, 1, 1, 1, 1, 1,
-            1, 1, 1, 1, 1, 1, 1, 1,
-        ]
+        :param audio: the song's audio if it has already been loaded, either a decoded `pygame.mixer.Sound` or a file
+        object for `pygame.mixer.music` to stream from. If not given the audio is streamed from the chart's audio file
+        :type audio: pygame.mixer.Sound | BinaryIO (optional)
+        """
+        self.__source = AUDIO_PATH / chart.get_audio()
+        self.__audio = audio
+        self.__chart = chart
+        self.__unit_length = 60000 / chart.bpm
+        self.__timestamps = chart.timestamps
+        self.__sequence = chart.lanes
         self.__playing = playing
         self.__current_note = -1
-        # Calculate which beats correspond to the note lengths above
-        new_sequence = [4]
-
-        # The sequence list is currently in the form in which each element represents
-        # a note length in multiples of 1 beat.
-        # The following code calculates, using said list, which beat numbers need to be active 
-        # in order for the player to reach the active beat in the correct amount of time.
-        for i in range(len(self.__sequence)):
-            if i % 2 == 0:
-                new_sequence.append((new_sequence[i] - self.__sequence[i]) % 9)
-            else:
-                new_sequence.append((new_sequence[i] + self.__sequence[i]) % 9)
-
-        self.__sequence = new_sequence
+        self.__envelope = None
 
     def play(self) -> None:
         """
@@ -527,17 +650,137 @@ class Song:
         """
         if not self.__playing:
             self.__playing = False
-            pygame.mixer.music.load(self.__source)
+            if not self.is_streamed():
+                self.__audio.set_volume(1)
+                self.__audio.play()
+                return
+            if self.__audio is not None:
+                pygame.mixer.music.load(self.__audio, self.__source.suffix[1:])
+            else:
+                pygame.mixer.music.load(self.__source)
             pygame.mixer.music.set_volume(1)
             pygame.mixer.music.play()
 
+    def set_envelope(self, envelope: Envelope) -> None:
+        """
+        Setter for the song's analysis, given to it by the song loader once the song has been analysed, which can be
+        after it has started playing.
+
+        :param envelope: the analysis
+        :type envelope: Envelope
+        """
+        self.__envelope = envelope
+
+    def get_envelope(self) -> Envelope:
+        """
+        Getter for the song's analysis, if the song loader has given it one.
+
+        :return: the analysis, or `None` if it hasn't been worked out yet.
+        """
+        return self.__envelope
+
+    def is_streamed(self) -> bool:
+        """
+        Checks if the song is played through `pygame.mixer.music` rather than as a decoded sound.
+
+        :return: `True` if the song is streamed.
+        """
+        return not isinstance(self.__audio, pygame.mixer.Sound)
+
     def get_next_note(self) -> int:
         """
         The function increments the current note index and returns the next note in the sequence.
         :return: The next note in the sequence.
         """
         self.__current_note += 1
+        return self.get_note()
+
+    def get_note_index(self) -> int:
+        """
+        Getter for the index of the current note.
+
+        :return: index of the note in the song.
+        """
+        return self.__current_note
+
+    def get_note(self) -> int:
+        """
+        The function returns the beat number of the current note.
+        :return: The current note in the sequence, or -1 if the song has finished.
+        """
         try:
             return self.__sequence[self.__current_note]
         except IndexError:
             return -1
+
+    def skip_to(self, song_time: float) -> int:
+        """
+        Moves the current note on to the first note that has not been reached by the given time.
+
+        :param song_time: position in the song in milliseconds
+        :type song_time: float
+        :return: the number of notes that were passed.
+        """
+        next_note = max(self.find_note(song_time), self.__current_note)
+        passed = next_note - self.__current_note
+        self.__current_note = next_note
+        return passed
+
+    def find_note(self, song_time: float) -> int:
+        """
+        Finds the first note whose time has not been reached yet.
+
+        :param song_time: position in the song in milliseconds
+        :type song_time: float
+        :return: index of the note, which is the number of notes in the song if they have all been reached.
+        """
+        return bisect_right(self.__timestamps, song_time)
+
+    def get_note_time(self, index: int = None) -> float:
+        """
+        Getter for the time of a note.
+
+        :param index: index of the note, defaults to the current note
+        :type index: int (optional)
+        :return: the note's time in milliseconds from the start of the song, infinity if there is no such note.
+        """
+        if index is None:
+            index = self.__current_note
+        try:
+            return self.__timestamps[index]
+        except IndexError:
+            return float("inf")
+
+    def get_lane(self, index: int) -> int:
+        """
+        Getter for the beat number of a note.
+
+        :param index: index of the note
+        :type index: int
+        :return: the beat number the note is on.
+        """
+        return self.__sequence[index]
+
+    def get_note_count(self) -> int:
+        """
+        Getter for the number of notes in the song.
+
+        :return: the number of notes.
+        """
+        return len(self.__sequence)
+
+    def get_chart(self) -> Chart:
+        """
+        Getter for the song's chart.
+
+        :return: the chart.
+        """
+        return self.__chart
+
+    def get_unit_length(self) -> float:
+        """
+        Getter for the length of one note length unit.
+
+        :return: the length in milliseconds.
+        """
+        return self.__unit_length
@@ -0,0 +1,136 @@
+import io
+import queue
+import threading
+from pathlib import Path
+
+import pygame
+
+from chart import AUDIO_PATH, load_chart
+from main import Song
+from visualiser import build_envelope, load_envelope, np
+
+# how much of the audio file is read at a time, progress is reported after each chunk
+CHUNK_SIZE = 1 << 20
+
+
+class SongLoader:
+    def __init__(self, source: Path, mode: str = "stream") -> None:
+        """
+        Initializes a loader that loads a song's chart and reads its audio on a worker thread, so the title screen can
+        keep animating while it loads.
+
+        :param source: file path of the song's chart
+        :type source: Path
+        :param mode: "sound" to decode the whole song into a `pygame.mixer.Sound` up front, or "stream" to read the file
+        into memory and let `pygame.mixer.music` stream it from there
+        :type mode: str
+        """
+        self.__source = source
+        self.__mode = mode
+        # progress, the loaded song or an error, picked up by `poll` on the main thread
+        self.__messages = queue.Queue()
+        self.__thread = threading.Thread(target=self.__load, daemon=True)
+
+        self.__progress = 0.0
+        self.__song = None
+        self.__error = None
+
+    def start(self) -> None:
+        """
+        Starts loading the song in the background.
+        """
+        self.__thread.start()
+
+    def poll(self) -> None:
+        """
+        Picks up any progress, errors or the finished song reported by the worker, without waiting for it. Should be
+        called once a frame.
+        """
+        while True:
+            try:
+                message, value = self.__messages.get_nowait()
+            except queue.Empty:
+                return
+            match message:
+                case "progress":
+                    self.__progress = value
+                case "done":
+                    self.__progress = 1.0
+                    self.__song = value
+                case "error":
+                    self.__error = value
+
+    def is_done(self) -> bool:
+        """
+        Checks if the loader has finished, whether the song loaded or not.
+
+        :return: `True` once the song has loaded or failed to.
+        """
+        return self.__song is not None or self.__error is not None
+
+    def get_progress(self) -> float:
+        """
+        Getter for how much of the song has been loaded.
+
+        :return: a value from 0 to 1.
+        """
+        return self.__progress
+
+    def get_error(self) -> str:
+        """
+        Getter for the reason the song failed to load.
+
+        :return: the error message, or `None` if nothing has gone wrong.
+        """
+        return self.__error
+
+    def get_source(self) -> Path:
+        """
+        Getter for the chart of the song being loaded.
+
+        :return: file path of the chart.
+        """
+        return self.__source
+
+    def get_song(self) -> Song:
+        """
+        Getter for the loaded song.
+
+        :return: the song, ready to play, or `None` if it hasn't finished loading or failed to.
+        """
+        return self.__song
+
+    def __load(self) -> None:
+        """
+        Loads the chart, then reads the audio file in chunks and prepares it for playing. Runs on the worker thread.
+        """
+        try:
+            chart = load_chart(self.__source)
+            audio_source = AUDIO_PATH / chart.get_audio()
+            size = max(audio_source.stat().st_size, 1)
+            data = bytearray()
+            with open(audio_source, "rb") as file:
+                while chunk := file.read(CHUNK_SIZE):
+                    data += chunk
+                    # decoding the audio is the last step, so reading the file only counts for most of the progress
+                    self.__messages.put(("progress", 0.8 * len(data) / size))
+
+            audio = io.BytesIO(data)
+            if self.__mode == "sound":
+                audio = pygame.mixer.Sound(file=audio)
+            song = Song(chart, False, audio=audio)
+        except Exception as error:
+            # anything that goes wrong has to be reported, otherwise the title screen waits for the song forever
+            self.__messages.put(("error", f"Couldn't load {self.__source.name}: {error}"))
+            return
+        self.__messages.put(("done", song))
+
+        # songs are analysed for the beats to light up with the first time they're loaded. that takes a while, so it's
+        # done once the song can already be played and the beats stay still until it's finished
+        if np is not None and audio_source.suffix == ".wav":
+            try:
+                build_envelope(audio_source)
+                song.set_envelope(load_envelope(audio_source))
+            except Exception:
+                # playing without the lights is better than not playing at all
+                pass
@@ -0,0 +1,171 @@
+import csv
+import json
+import time
+from array import array
+from pathlib import Path
+
+import pygame
+
+from text_cache import CachedText, font_cache
+
+# every part of a frame that is timed, for both gameplay and the title screen
+PHASES = ("input", "judgement", "clear", "background", "beats", "player", "images", "score", "display", "tick")
+# frames kept in the ring buffer, about 10 seconds at 60fps
+CAPACITY = 600
+# how many of the most recent frames the overlay's numbers are worked out from
+OVERLAY_FRAMES = 60
+OVERLAY_RECT = pygame.Rect(600, 0, 210, 90)
+
+
+class FrameProfiler:
+    def __init__(self, enabled: bool = False, capacity: int = CAPACITY) -> None:
+        """
+        Initializes a profiler that times each phase of every frame, keeping the most recent frames in a ring buffer.
+        The buffer is allocated once up front, so recording a frame doesn't allocate anything new for it.
+
+        :param enabled: whether anything is recorded, when `False` every method returns straight away
+        :type enabled: bool
+        :param capacity: the number of frames kept, older frames are overwritten
+        :type capacity: int
+        """
+        self.__enabled = enabled
+        self.__capacity = capacity
+        # each row is one frame, the time of each phase in seconds followed by the whole frame's time
+        self.__columns = len(PHASES) + 1
+        self.__timings = array("d", [0.0]) * (capacity * self.__columns)
+        self.__phase_columns = {phase: column for column, phase in enumerate(PHASES)}
+        self.__frames = 0
+        self.__row = 0
+        self.__frame_start = 0.0
+        self.__last_mark = 0.0
+
+        self.__overlay = False
+        self.__overlay_lines = None
+
+    def is_enabled(self) -> bool:
+        """
+        Getter for whether the profiler is recording.
+
+        :return: `True` if frames are being recorded.
+        """
+        return self.__enabled
+
+    def begin_frame(self) -> None:
+        """
+        Starts timing a new frame, overwriting the oldest frame if the buffer is full.
+        """
+        if not self.__enabled:
+            return
+        self.__row = (self.__frames % self.__capacity) * self.__columns
+        for column in range(self.__row, self.__row + self.__columns):
+            self.__timings[column] = 0.0
+        self.__frame_start = self.__last_mark = time.perf_counter()
+
+    def mark(self, phase: str) -> None:
+        """
+        Ends a phase, adding the time since the last mark to it. A phase can be marked more than once in a frame, the
+        times are added together.
+
+        :param phase: the phase that has just finished, one of `PHASES`
+        :type phase: str
+        """
+        if not self.__enabled:
+            return
+        now = time.perf_counter()
+        self.__timings[self.__row + self.__phase_columns[phase]] += now - self.__last_mark
+        self.__last_mark = now
+
+    def end_frame(self) -> None:
+        """
+        Finishes timing the current frame.
+        """
+        if not self.__enabled:
+            return
+        self.__timings[self.__row + self.__columns - 1] = time.perf_counter() - self.__frame_start
+        self.__frames += 1
+
+    def toggle_overlay(self) -> None:
+        """
+        Shows or hides the overlay, it can only be shown while the profiler is recording.
+        """
+        self.__overlay = self.__enabled and not self.__overlay
+
+    def is_overlay_shown(self) -> bool:
+        """
+        Getter for whether the overlay is shown.
+
+        :return: `True` if the overlay should be drawn.
+        """
+        return self.__overlay
+
+    def draw_overlay(self, window: pygame.Surface) -> None:
+        """
+        Draws the frame rate, a graph of recent frame times and the slowest phase in the top right of the window.
+
+        :param window: the surface to draw on
+        :type window: pygame.Surface
+        """
+        if not self.__overlay or self.__frames == 0:
+            return
+        if self.__overlay_lines is None:
+            font = font_cache.get_font("monospace", 14)
+            self.__overlay_lines = [CachedText(font, "FPS: {:.0f}", (255, 255, 255)),
+                                    CachedText(font, "frame: {:.1f}ms", (255, 255, 255)),
+                                    CachedText(font, "worst: {} {:.1f}ms", (255, 255, 255))]
+        window.fill((0, 0, 0), OVERLAY_RECT)
+
+        recent = self.__recent_rows(OVERLAY_FRAMES)
+        frame_column = self.__columns - 1
+        mean_frame = sum(self.__timings[row + frame_column] for row in recent) / len(recent)
+        phase_means = [sum(self.__timings[row + column] for row in recent) / len(recent)
+                       for column in range(len(PHASES))]
+        worst = max(range(len(PHASES)), key=phase_means.__getitem__)
+
+        # rounding stops the text being rendered again every single frame
+        x, y = OVERLAY_RECT.topleft
+        self.__overlay_lines[0].draw(window, (x + 4, y + 2), round(1 / mean_frame) if mean_frame else 0)
+        self.__overlay_lines[1].draw(window, (x + 4, y + 16), round(mean_frame * 1000, 1))
+        self.__overlay_lines[2].draw(window, (x + 4, y + 30), PHASES[worst], round(phase_means[worst] * 1000, 1))
+
+        # one pixel wide bar per frame, the full height of the graph is two 60fps frames
+        graph_bottom = OVERLAY_RECT.bottom - 2
+        graph_height = OVERLAY_RECT.bottom - (y + 48)
+        for offset, row in enumerate(self.__recent_rows(OVERLAY_RECT.width - 8)):
+            height = min(int(self.__timings[row + frame_column] * 30 * graph_height), graph_height)
+            colour = (73, 252, 73) if self.__timings[row + frame_column] <= 1 / 60 else (252, 73, 73)
+            window.fill(colour, (x + 4 + offset, graph_bottom - height, 1, height))
+
+    def export(self, path: Path) -> None:
+        """
+        Writes every frame in the buffer, oldest first, to a file. The format is picked from the file's extension,
+        ".csv" for CSV and anything else for JSON. Times are in milliseconds.
+
+        :param path: file path to write to
+        :type path: Path
+        """
+        if not self.__enabled:
+            return
+        names = list(PHASES) + ["frame"]
+        rows = [[self.__timings[row + column] * 1000 for column in range(self.__columns)]
+                for row in self.__recent_rows(self.__capacity)]
+
+        path = Path(path)
+        if path.suffix == ".csv":
+            with open(path, "w", newline="") as file:
+                writer = csv.writer(file)
+                writer.writerow(names)
+                writer.writerows(rows)
+        else:
+            with open(path, "w") as file:
+                json.dump([dict(zip(names, row)) for row in rows], file)
+
+    def __recent_rows(self, count: int) -> list:
+        """
+        Finds where the most recent frames are in the buffer.
+
+        :param count: the most frames to find
+        :type count: int
+        :return: the index of the start of each frame's row, oldest first.
+        """
+        count = min(count, self.__frames, self.__capacity)
+        return [((self.__frames - count + i) % self.__capacity) * self.__columns for i in range(count)]
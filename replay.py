@@ -0,0 +1,206 @@
+import argparse
+import struct
+import sys
+import time
+from array import array
+from pathlib import Path
+
+from chart import CHART_PATH, Chart, load_chart
+from main import GameManager, Song
+from simulation import HeadlessApp, ScriptedBot, simulate
+
+REPLAY_PATH = Path("./Replays")
+
+# a replay is a header followed by the press times, 8 bytes a press
+MAGIC = b"SBRP"
+VERSION = 1
+# magic, version, chart hash (sha1), calibration offset, claimed score, number of presses
+HEADER = struct.Struct("<4sH20sdII")
+
+
+class Replay:
+    def __init__(self, chart_hash: str, offset_ms: float, presses=(), score: int = 0) -> None:
+        """
+        Initializes a replay of one run of a chart. The judgement only depends on when space was pressed, so the press
+        times and the calibration they were judged with are all that is needed to play the run again.
+
+        :param chart_hash: hash of the chart that was played, see `Chart.chart_hash`
+        :type chart_hash: str
+        :param offset_ms: the calibration offset the presses were judged with
+        :type offset_ms: float
+        :param presses: the press times in milliseconds from the start of the song
+        :type presses: Iterable[float]
+        :param score: the score the run claims to have got
+        :type score: int
+        """
+        self.chart_hash = chart_hash
+        self.offset_ms = offset_ms
+        self.presses = array("d", presses)
+        self.score = score
+
+    def to_bytes(self) -> bytes:
+        """
+        Packs the replay into its binary form.
+
+        :return: the replay's bytes.
+        """
+        header = HEADER.pack(MAGIC, VERSION, bytes.fromhex(self.chart_hash), self.offset_ms, self.score,
+                             len(self.presses))
+        return header + self.presses.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Replay":
+        """
+        Unpacks a replay from its binary form.
+
+        :param data: the replay's bytes
+        :type data: bytes
+        :return: the replay.
+        """
+        if len(data) < HEADER.size:
+            raise ValueError("not a replay, or one from a different version of the game")
+        magic, version, chart_hash, offset_ms, score, count = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not a replay, or one from a different version of the game")
+        presses = array("d")
+        presses.frombytes(data[HEADER.size:HEADER.size + count * presses.itemsize])
+        if len(presses) != count:
+            raise ValueError("replay is cut short")
+        return cls(chart_hash.hex(), offset_ms, presses, score)
+
+
+def save_replay(replay: Replay, path: Path = None) -> Path:
+    """
+    Writes a replay to a file.
+
+    :param replay: the replay to save
+    :type replay: Replay
+    :param path: the file to write to, if not given a new file is made in `Replays/`
+    :type path: Path (optional)
+    :return: the path the replay was written to.
+    """
+    if path is None:
+        REPLAY_PATH.mkdir(exist_ok=True)
+        path = REPLAY_PATH / f"{replay.chart_hash[:8]}-{time.strftime('%Y%m%d-%H%M%S')}-{replay.score}.replay"
+    path.write_bytes(replay.to_bytes())
+    return path
+
+
+def load_replay(path: Path) -> Replay:
+    """
+    Reads a replay from a file.
+
+    :param path: the replay's file
+    :type path: Path
+    :return: the replay.
+    """
+    return Replay.from_bytes(path.read_bytes())
+
+
+def find_chart(chart_hash: str) -> Chart:
+    """
+    Finds the chart a replay was recorded on among the charts in `Charts/`.
+
+    :param chart_hash: hash of the chart
+    :type chart_hash: str
+    :return: the chart, or `None` if none of the charts match.
+    """
+    for path in sorted(CHART_PATH.glob("*.chart")):
+        chart = load_chart(path)
+        if chart.chart_hash == chart_hash:
+            return chart
+    return None
+
+
+def verify_replay(replay: Replay, chart: Chart, app: HeadlessApp = None) -> tuple:
+    """
+    Plays a replay again through the headless game to check the score it claims.
+
+    :param replay: the replay to check
+    :type replay: Replay
+    :param chart: the chart the replay was recorded on
+    :type chart: Chart
+    :param app: the headless app to play in, one is made if not given
+    :type app: HeadlessApp (optional)
+    :return: whether the claimed score matches, and the score and beat stats the replay actually gets.
+    """
+    if chart.chart_hash != replay.chart_hash:
+        raise ValueError("replay was recorded on a different chart")
+    stats = simulate(chart, ScriptedBot(replay.presses), app, replay.offset_ms)
+    return stats[0] == replay.score, stats
+
+
+class Ghost:
+    def __init__(self, replay: Replay, chart: Chart) -> None:
+        """
+        Initializes a ghost, an earlier run played alongside the current one. The ghost is played without a display,
+        and stepped along with the song so its score is always where it was at the same point of the earlier run.
+
+        :param replay: the earlier run
+        :type replay: Replay
+        :param chart: the chart being played
+        :type chart: Chart
+        """
+        if chart.chart_hash != replay.chart_hash:
+            raise ValueError("ghost was recorded on a different chart")
+        self.__game = GameManager(HeadlessApp(), Song(chart, False), replay.offset_ms)
+        self.__presses = replay.presses
+        self.__next_press = 0
+        self.__playing = True
+
+    def advance(self, song_time: float) -> None:
+        """
+        Plays the ghost's run up to a point in the song.
+
+        :param song_time: the time in milliseconds from the start of the song
+        :type song_time: float
+        """
+        if not self.__playing:
+            return
+        start = self.__next_press
+        while self.__next_press < len(self.__presses) and self.__presses[self.__next_press] <= song_time:
+            self.__next_press += 1
+        self.__playing = self.__game.step(song_time, self.__presses[start:self.__next_press])
+
+    def get_stats(self) -> tuple:
+        """
+        Getter for the ghost's score so far.
+
+        :return: the score and beat stats, the same as `Score.get_stats()`.
+        """
+        return self.__game.get_score().get_stats()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Checks or plays back replays")
+    parser.add_argument("mode", choices=("verify", "play"),
+                        help="verify: check each replay's score without a display, play: watch a replay")
+    parser.add_argument("replays", nargs="+", type=Path, help="replay files")
+    parser.add_argument("--speed", type=float, default=1.0, help="how fast to play a replay back")
+    args = parser.parse_args()
+
+    failed = False
+    headless_app = HeadlessApp() if args.mode == "verify" else None
+    for replay_path in args.replays:
+        loaded = load_replay(replay_path)
+        replay_chart = find_chart(loaded.chart_hash)
+        if replay_chart is None:
+            print(f"{replay_path}: chart {loaded.chart_hash} not found", file=sys.stderr)
+            failed = True
+            continue
+
+        if args.mode == "verify":
+            matches, (replay_score, beat_stats) = verify_replay(loaded, replay_chart, headless_app)
+            print(f"{replay_path}: {'OK' if matches else 'MISMATCH'}, claimed {loaded.score}, "
+                  f"replayed {replay_score} {beat_stats}")
+            failed = failed or not matches
+        else:
+            # app saves replays with this module, so it can only be imported once this module has loaded
+            from app import App
+
+            app = App()
+            # the mixer is opened by the title screen, which isn't shown here
+            app.start_mixer()
+            game = GameManager(app, Song(replay_chart, False), playback=loaded, speed=args.speed)
+            print(f"{replay_path}: {game.game_loop()}")
+    sys.exit(1 if failed else 0)
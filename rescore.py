@@ -0,0 +1,237 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from chart import CHART_PATH, load_chart
+from replay import REPLAY_PATH, load_replay
+from simulation import HeadlessApp, ScriptedBot, simulate_game
+
+# how many replays each worker is given at a time, big enough that sending work to the workers doesn't dominate
+CHUNK_SIZE = 64
+# characters used to draw the hit rate heatmaps, from no hits to every hit
+HEATMAP_SHADES = " .:-=+*#%@"
+HEATMAP_WIDTH = 64
+HISTOGRAM_BINS = 10
+LEADERBOARD_SIZE = 10
+
+# each worker keeps its own charts by hash, so every chart is only loaded once per worker
+_chart_path = CHART_PATH
+_charts = None
+_app = None
+
+
+def _init_worker(chart_path: Path) -> None:
+    """
+    Sets up a worker process, run once when the worker starts.
+
+    :param chart_path: the folder the replays' charts are in
+    :type chart_path: Path
+    """
+    global _chart_path, _charts, _app
+    _chart_path = chart_path
+    _charts = None
+    _app = HeadlessApp()
+
+
+def _get_chart(chart_hash: str):
+    """
+    Finds a chart by its hash in the worker's chart cache, the charts are loaded the first time one is asked for.
+
+    :param chart_hash: hash of the chart
+    :type chart_hash: str
+    :return: the chart, or `None` if there isn't a chart with that hash.
+    """
+    global _charts
+    if _charts is None:
+        _charts = {}
+        for path in sorted(_chart_path.glob("*.chart")):
+            chart = load_chart(path)
+            _charts[chart.chart_hash] = chart
+    return _charts.get(chart_hash)
+
+
+def rescore_chunk(paths: list) -> tuple:
+    """
+    Scores a chunk of replays again with the current scoring rules, run in a worker process.
+
+    :param paths: the replays' files
+    :type paths: list
+    :return: a result for each replay, and how often each note of each chart was hit across the chunk. The hit counts
+    are added up in the worker so only one set per chart is sent back.
+    """
+    if _app is None:
+        _init_worker(_chart_path)
+    results = []
+    hit_counts = {}
+    for path in paths:
+        try:
+            replay = load_replay(path)
+        except (OSError, ValueError) as error:
+            results.append({"path": str(path), "error": str(error)})
+            continue
+        chart = _get_chart(replay.chart_hash)
+        if chart is None:
+            results.append({"path": str(path), "chart": replay.chart_hash, "error": "chart not found"})
+            continue
+
+        game = simulate_game(chart, ScriptedBot(replay.presses), _app, replay.offset_ms)
+        score, beat_stats = game.get_score().get_stats()
+        results.append({"path": str(path), "chart": replay.chart_hash, "claimed": replay.score, "score": score,
+                        **beat_stats})
+
+        if replay.chart_hash not in hit_counts:
+            note_count = len(chart.timestamps)
+            hit_counts[replay.chart_hash] = [0, array("I", bytes(4 * note_count)), array("I", bytes(4 * note_count))]
+        counts = hit_counts[replay.chart_hash]
+        counts[0] += 1
+        for note, hit in enumerate(game.get_hits()):
+            if hit:
+                counts[1][note] += 1
+                if hit == 2:
+                    counts[2][note] += 1
+    return results, hit_counts
+
+
+def rescore(paths: list, workers: int = None, chunk_size: int = CHUNK_SIZE, chart_path: Path = CHART_PATH) -> tuple:
+    """
+    Scores replays again across every CPU core.
+
+    :param paths: the replays' files
+    :type paths: list
+    :param workers: the number of worker processes, defaults to one per CPU core
+    :type workers: int (optional)
+    :param chunk_size: how many replays each worker is given at a time
+    :type chunk_size: int
+    :param chart_path: the folder the replays' charts are in
+    :type chart_path: Path
+    :return: a result for each replay, in no particular order, and the hit counts for each chart added up over every
+    replay.
+    """
+    results = []
+    hit_counts = {}
+    chunks = [paths[i:i + chunk_size] for i in range(0, len(paths), chunk_size)]
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(chart_path,)) as executor:
+        for future in as_completed([executor.submit(rescore_chunk, chunk) for chunk in chunks]):
+            chunk_results, chunk_counts = future.result()
+            results += chunk_results
+            for chart_hash, (count, hits, perfects) in chunk_counts.items():
+                if chart_hash not in hit_counts:
+                    hit_counts[chart_hash] = [count, hits, perfects]
+                    continue
+                total = hit_counts[chart_hash]
+                total[0] += count
+                for note in range(len(hits)):
+                    total[1][note] += hits[note]
+                    total[2][note] += perfects[note]
+    return results, hit_counts
+
+
+def summarise(results: list, hit_counts: dict) -> dict:
+    """
+    Works out the statistics for each chart from the re-scored replays.
+
+    :param results: a result for each replay, from `rescore`
+    :type results: list
+    :param hit_counts: the hit counts for each chart, from `rescore`
+    :type hit_counts: dict
+    :return: for each chart by hash, the number of replays, how many changed score, the score distribution, the hit
+    and perfect rate of every note and a leaderboard of the best replays.
+    """
+    charts = {}
+    for chart_hash, (count, hits, perfects) in hit_counts.items():
+        scored = [result for result in results if result.get("chart") == chart_hash and "error" not in result]
+        scores = [result["score"] for result in scored]
+        # 10 points for a perfect hit on every note, the first note can't be hit
+        best_possible = max(10 * (len(hits) - 1), 1)
+        histogram = [0] * HISTOGRAM_BINS
+        for score in scores:
+            histogram[min(score * HISTOGRAM_BINS // best_possible, HISTOGRAM_BINS - 1)] += 1
+        leaderboard = sorted(scored, key=lambda result: result["score"], reverse=True)[:LEADERBOARD_SIZE]
+        charts[chart_hash] = {
+            "replays": count,
+            "changed": sum(result["score"] != result["claimed"] for result in scored),
+            "mean": statistics.fmean(scores),
+            "median": statistics.median(scores),
+            "min": min(scores),
+            "max": max(scores),
+            "best_possible": best_possible,
+            "histogram": histogram,
+            "hit_rate": [note_hits / count for note_hits in hits],
+            "perfect_rate": [note_perfects / count for note_perfects in perfects],
+            "leaderboard": [{"path": result["path"], "score": result["score"]} for result in leaderboard],
+        }
+    return charts
+
+
+def print_report(charts: dict, errors: list) -> None:
+    """
+    Prints the statistics for each chart, with the score distribution as a bar chart and the hit rate of each note as
+    a heatmap.
+
+    :param charts: the statistics from `summarise`
+    :type charts: dict
+    :param errors: the results for replays that couldn't be scored
+    :type errors: list
+    """
+    for chart_hash, stats in charts.items():
+        print(f"chart {chart_hash}: {stats['replays']} replays, {stats['changed']} changed score")
+        print(f"  score mean {stats['mean']:.1f}, median {stats['median']}, min {stats['min']}, max {stats['max']} "
+              f"(out of {stats['best_possible']})")
+        most = max(stats["histogram"]) or 1
+        bin_width = stats["best_possible"] / HISTOGRAM_BINS
+        for i, count in enumerate(stats["histogram"]):
+            print(f"  {i * bin_width:7.0f}+ {'#' * round(40 * count / most):<40} {count}")
+
+        print(f"  hit rate per note, '{HEATMAP_SHADES[0]}' none to '{HEATMAP_SHADES[-1]}' every replay:")
+        hit_rate = stats["hit_rate"]
+        for start in range(0, len(hit_rate), HEATMAP_WIDTH):
+            row = hit_rate[start:start + HEATMAP_WIDTH]
+            shades = "".join(HEATMAP_SHADES[min(int(rate * len(HEATMAP_SHADES)), len(HEATMAP_SHADES) - 1)]
+                             for rate in row)
+            print(f"  {start:5} |{shades}|")
+    for error in errors:
+        print(f"{error['path']}: {error['error']}", file=sys.stderr)
+
+
+def find_replays(sources: list) -> list:
+    """
+    Lists the replay files given, looking inside any folders.
+
+    :param sources: replay files and folders of replays
+    :type sources: list
+    :return: the replays' files.
+    """
+    paths = []
+    for source in sources:
+        paths += sorted(source.glob("*.replay")) if source.is_dir() else [source]
+    return paths
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Scores replays again with the current scoring rules")
+    parser.add_argument("replays", nargs="*", type=Path, default=[REPLAY_PATH], help="replay files or folders")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="replays given to a worker at a time")
+    parser.add_argument("--charts", type=Path, default=CHART_PATH, help="folder the replays' charts are in")
+    parser.add_argument("--output", help="file to write every replay's new score and the statistics to as JSON")
+    args = parser.parse_args()
+
+    replay_paths = find_replays(args.replays)
+    start = time.perf_counter()
+    replay_results, chart_hit_counts = rescore(replay_paths, args.workers, args.chunk_size, args.charts)
+    elapsed = time.perf_counter() - start
+
+    chart_stats = summarise(replay_results, chart_hit_counts)
+    failed = [result for result in replay_results if "error" in result]
+    print_report(chart_stats, failed)
+    print(f"{len(replay_paths)} replays scored in {elapsed:.1f}s with {args.workers} workers")
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump({"replays": replay_results, "charts": chart_stats}, output, indent=2)
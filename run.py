@@ -1,18 +1,33 @@
+import argparse
+from pathlib import Path
 
-from title_gui import GuiManager
-from main import GameManager
+from frame_pacing import REFRESH_RATES
+from startup import StartupTrace
 
 if __name__ == '__main__':
-    gui_manager = GuiManager()
-    gui_manager.gui_loop()
+    parser = argparse.ArgumentParser(description="Space Bass")
+    parser.add_argument("--fps", choices=["uncapped" if rate is None else str(rate) for rate in REFRESH_RATES],
+                        default="60",
+                        help="frame rate the game is drawn at")
+    parser.add_argument("--vsync", action="store_true", help="sync frames to the monitor instead of sleeping")
+    parser.add_argument("--audio", choices=["stream", "sound"], default="stream",
+                        help="stream songs from memory, or decode them fully before they play")
+    parser.add_argument("--profile", nargs="?", const="profile.json", metavar="FILE",
+                        help="time every frame and save the timings to FILE (.json or .csv) on exit, F3 shows an overlay")
+    parser.add_argument("--ghost", type=Path, metavar="FILE", help="play a replay alongside every game as a ghost")
+    parser.add_argument("--fullscreen", action="store_true", help="fill the screen at the desktop's resolution")
+    parser.add_argument("--scale", choices=["integer", "smooth"], default="integer",
+                        help="scale the game up in whole pixels with borders, or smoothly to fill the screen")
+    parser.add_argument("--trace-startup", action="store_true",
+                        help="print how long each part of starting up took once the title screen is shown")
+    args = parser.parse_args()
+    refresh_rate = None if args.fps == "uncapped" else int(args.fps)
 
-    while True:
-        # waiting for space to be pressed on the title screen before game starts
-        while not gui_manager.start_game:
-            pass
+    # pygame and the game are only imported once the trace has started, so it covers the imports too
+    trace = StartupTrace(enabled=args.trace_startup)
+    import pygame  # noqa: F401, imported on its own to time it apart from the game
+    trace.mark("import pygame")
+    from app import App
+    trace.mark("import game")
 
-        game_manager = GameManager()
-        score = game_manager.game_loop()
-
-        gui_manager = GuiManager(score)
-        gui_manager.gui_loop()
+    App(refresh_rate, args.vsync, args.audio, args.profile, args.ghost, args.fullscreen, args.scale, trace).run()
@@ -0,0 +1,239 @@
+import getpass
+import queue
+import sqlite3
+import threading
+from pathlib import Path
+
+SCORES_PATH = Path("./scores.db")
+
+# the writer saves up to this many sessions in one transaction
+BATCH_SIZE = 256
+# how long the writer waits for more sessions to save together, in seconds
+BATCH_WAIT = 0.05
+TOP_SCORES = 5
+# sessions are saved under this name if the user logged in can't be found
+DEFAULT_PLAYER = "player"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    chart TEXT NOT NULL,
+    player TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    beats INTEGER NOT NULL,
+    good INTEGER NOT NULL,
+    perfect INTEGER NOT NULL,
+    started REAL NOT NULL,
+    finished REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_chart_score ON sessions (chart, score DESC);
+CREATE INDEX IF NOT EXISTS sessions_player_chart_score ON sessions (player, chart, score DESC);
+"""
+
+
+class ScoreQuery:
+    def __init__(self, chart_hash: str, player: str) -> None:
+        """
+        Initializes a request for a chart's high scores, which is answered by the store's thread. The results screen
+        checks on it each frame rather than waiting for it.
+
+        :param chart_hash: hash of the chart
+        :type chart_hash: str
+        :param player: the player whose personal best is looked up
+        :type player: str
+        """
+        self.chart_hash = chart_hash
+        self.player = player
+        self.__done = threading.Event()
+        self.__top = []
+        self.__best = None
+
+    def set_result(self, top: list, best: int) -> None:
+        """
+        Setter for the answer, called by the store's thread.
+
+        :param top: the best scores for the chart, highest first
+        :type top: list
+        :param best: the player's best score, `None` if they haven't played the chart
+        :type best: int (optional)
+        """
+        self.__top = top
+        self.__best = best
+        self.__done.set()
+
+    def is_done(self) -> bool:
+        """
+        Checks if the query has been answered.
+
+        :return: `True` once the scores have been looked up.
+        """
+        return self.__done.is_set()
+
+    def get_top(self) -> list:
+        """
+        Getter for the chart's best scores.
+
+        :return: the scores, highest first.
+        """
+        return self.__top
+
+    def get_best(self) -> int:
+        """
+        Getter for the player's best score on the chart.
+
+        :return: the score, `None` if they haven't played the chart.
+        """
+        return self.__best
+
+
+class ScoreStore:
+    def __init__(self, path: Path = SCORES_PATH, player: str = None) -> None:
+        """
+        Initializes a store that keeps the result of every session in an SQLite database. The database is only ever
+        touched by the store's own thread, sessions are queued and saved in batches and high scores are looked up in
+        the background, so the game never waits on the disk.
+
+        :param path: file path of the database
+        :type path: Path
+        :param player: name the sessions are saved under, defaults to the user logged in, or `DEFAULT_PLAYER` if there
+        isn't one
+        :type player: str (optional)
+        """
+        self.__path = path
+        if player is None:
+            try:
+                player = getpass.getuser()
+            except (OSError, KeyError, ImportError):
+                # no user name is set in the environment and the account has none
+                player = DEFAULT_PLAYER
+        self.__player = player
+        # sessions to save and queries to answer, sqlite connections can only be used on the thread that opened them
+        self.__requests = queue.Queue()
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+
+    def start(self) -> None:
+        """
+        Starts the store's thread.
+        """
+        self.__thread.start()
+
+    def close(self) -> None:
+        """
+        Saves any sessions that are still queued and stops the store's thread.
+        """
+        if self.__thread.is_alive():
+            self.__requests.put(("close", None))
+            self.__thread.join()
+
+    def record(self, chart_hash: str, stats: tuple, started: float, finished: float) -> None:
+        """
+        Queues a session to be saved, returns straight away.
+
+        :param chart_hash: hash of the chart that was played
+        :type chart_hash: str
+        :param stats: the score and beat stats, from `Score.get_stats()`
+        :type stats: tuple
+        :param started: when the session started, as a Unix timestamp
+        :type started: float
+        :param finished: when the session finished, as a Unix timestamp
+        :type finished: float
+        """
+        score, beat_stats = stats
+        self.__requests.put(("record", (chart_hash, self.__player, score, beat_stats["beats"], beat_stats["good"],
+                                        beat_stats["perfect"], started, finished)))
+
+    def query(self, chart_hash: str) -> ScoreQuery:
+        """
+        Queues a lookup of a chart's high scores and the player's personal best, returns straight away. Sessions
+        recorded before this are included.
+
+        :param chart_hash: hash of the chart
+        :type chart_hash: str
+        :return: the query, which is answered in the background.
+        """
+        score_query = ScoreQuery(chart_hash, self.__player)
+        self.__requests.put(("query", score_query))
+        return score_query
+
+    def __run(self) -> None:
+        """
+        Runs on the store's thread, saving sessions and answering queries in the order they were asked for.
+        """
+        connection = sqlite3.connect(self.__path)
+        # the write ahead log makes each batch a single append rather than a rewrite of the database
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript(SCHEMA)
+        try:
+            while True:
+                requests = [self.__requests.get()]
+                # anything else that arrives in the meantime is handled with it
+                try:
+                    while len(requests) < BATCH_SIZE:
+                        requests.append(self.__requests.get(timeout=BATCH_WAIT))
+                except queue.Empty:
+                    pass
+                if not self.__handle(connection, requests):
+                    return
+        finally:
+            connection.close()
+
+    def __handle(self, connection: sqlite3.Connection, requests: list) -> bool:
+        """
+        Handles a batch of requests, saving every session before a query in one transaction.
+
+        :param connection: the store's database connection
+        :type connection: sqlite3.Connection
+        :param requests: the requests, in order
+        :type requests: list
+        :return: `False` once the store has been closed.
+        """
+        sessions = []
+        for request, value in requests:
+            if request == "record":
+                sessions.append(value)
+                continue
+            if sessions:
+                self.__save(connection, sessions)
+                sessions = []
+            match request:
+                case "query":
+                    value.set_result(*self.__look_up(connection, value.chart_hash, value.player))
+                case "close":
+                    return False
+        if sessions:
+            self.__save(connection, sessions)
+        return True
+
+    @staticmethod
+    def __save(connection: sqlite3.Connection, sessions: list) -> None:
+        """
+        Saves sessions in one transaction.
+
+        :param connection: the store's database connection
+        :type connection: sqlite3.Connection
+        :param sessions: a row for each session
+        :type sessions: list
+        """
+        with connection:
+            connection.executemany("INSERT INTO sessions (chart, player, score, beats, good, perfect, started, finished) "
+                                   "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", sessions)
+
+    @staticmethod
+    def __look_up(connection: sqlite3.Connection, chart_hash: str, player: str) -> tuple:
+        """
+        Looks up a chart's best scores and a player's best score on it, both are answered from the indexes.
+
+        :param connection: the store's database connection
+        :type connection: sqlite3.Connection
+        :param chart_hash: hash of the chart
+        :type chart_hash: str
+        :param player: the player
+        :type player: str
+        :return: the chart's best scores as (player, score) pairs, highest first, and the player's best score.
+        """
+        top = connection.execute("SELECT player, score FROM sessions WHERE chart = ? ORDER BY score DESC LIMIT ?",
+                                 (chart_hash, TOP_SCORES)).fetchall()
+        best = connection.execute("SELECT MAX(score) FROM sessions WHERE player = ? AND chart = ?",
+                                  (player, chart_hash)).fetchone()[0]
+        return top, best
@@ -0,0 +1,161 @@
+import sys
+import time
+from pathlib import Path
+
+import pygame
+
+from chart import CHART_PATH, Chart, load_chart
+from frame_pacing import FramePacer
+from main import GameManager, Song
+from profiler import FrameProfiler
+from timing import PERFECT_WINDOW_MS
+
+
+class HeadlessApp:
+    def __init__(self, size: tuple = (810, 500)) -> None:
+        """
+        Initializes a stand-in for `App` for running the game without a display. Gameplay is drawn on, and measured
+        against, an ordinary surface the same size as the window instead. Neither the display nor the mixer is started,
+        so this can be used alongside a real window, e.g. for a ghost.
+
+        :param size: width and height of the pretend window
+        :type size: tuple
+        """
+        pygame.font.init()
+        self.__window = pygame.Surface(size)
+        self.__pacer = FramePacer(None)
+        self.__profiler = FrameProfiler()
+
+    def get_window(self) -> pygame.Surface:
+        """
+        Getter for the surface standing in for the window.
+
+        :return: the surface.
+        """
+        return self.__window
+
+    def get_display(self) -> None:
+        """
+        Getter for the display, there isn't one as nothing is ever shown.
+
+        :return: `None`.
+        """
+        return None
+
+    def get_pacer(self) -> FramePacer:
+        """
+        Getter for the frame pacer, which is uncapped as nothing waits for frames.
+
+        :return: the frame pacer.
+        """
+        return self.__pacer
+
+    def get_profiler(self) -> FrameProfiler:
+        """
+        Getter for the frame profiler, which is turned off as no frames are drawn.
+
+        :return: the frame profiler.
+        """
+        return self.__profiler
+
+
+class AutoplayBot:
+    def __init__(self, early_ms: float = PERFECT_WINDOW_MS / 2) -> None:
+        """
+        Initializes a bot that presses space for every note in a chart.
+
+        :param early_ms: how long before each note the bot presses space, the default is in the middle of the perfect
+        window
+        :type early_ms: float
+        """
+        self.__early_ms = early_ms
+
+    def get_presses(self, chart: Chart) -> list:
+        """
+        Works out when the bot presses space, only presses are judged so releases aren't simulated.
+
+        :param chart: the chart being played
+        :type chart: Chart
+        :return: the press times in milliseconds, in order.
+        """
+        # the first note is where the player starts, so it can't be hit
+        return [note_time - self.__early_ms for note_time in chart.timestamps[1:]]
+
+
+class ScriptedBot:
+    def __init__(self, presses: list) -> None:
+        """
+        Initializes a bot that presses space at set times.
+
+        :param presses: press times in milliseconds
+        :type presses: list
+        """
+        self.__presses = sorted(presses)
+
+    def get_presses(self, chart: Chart) -> list:
+        """
+        Works out when the bot presses space.
+
+        :param chart: the chart being played, which doesn't change the script
+        :type chart: Chart
+        :return: the press times in milliseconds, in order.
+        """
+        return self.__presses
+
+
+def simulate_game(chart: Chart, bot, app: HeadlessApp = None, calibration_offset: float = 0.0) -> GameManager:
+    """
+    Plays a chart from start to finish without a display or audio, using the same game logic as the real game.
+
+    Rather than running in real time, the game is only stepped at the moments anything can happen, when space is
+    pressed and at the end of the song, so a whole song is played in a fraction of a second and always gives the same
+    result.
+
+    :param chart: the chart to play
+    :type chart: Chart
+    :param bot: the player, anything with a `get_presses(chart)` method such as `AutoplayBot` or `ScriptedBot`
+    :param app: the headless app to play in, one is made if not given
+    :type app: HeadlessApp (optional)
+    :param calibration_offset: the player's calibration, which the presses are judged with
+    :type calibration_offset: float
+    :return: the finished game, for its score and how each note was hit.
+    """
+    game = GameManager(app if app is not None else HeadlessApp(), Song(chart, False), calibration_offset)
+
+    # every note passed between two steps is still counted, so stepping at each press is enough
+    for press_time in bot.get_presses(chart):
+        if not game.step(press_time, [press_time]):
+            break
+    else:
+        # notes are judged `calibration_offset` earlier, so the last one is only passed that much after its time
+        game.step(chart.timestamps[-1] + max(calibration_offset, 0))
+    return game
+
+
+def simulate(chart: Chart, bot, app: HeadlessApp = None, calibration_offset: float = 0.0) -> tuple:
+    """
+    Plays a chart from start to finish without a display or audio, see `simulate_game`.
+
+    :param chart: the chart to play
+    :type chart: Chart
+    :param bot: the player, anything with a `get_presses(chart)` method such as `AutoplayBot` or `ScriptedBot`
+    :param app: the headless app to play in, one is made if not given
+    :type app: HeadlessApp (optional)
+    :param calibration_offset: the player's calibration, which the presses are judged with
+    :type calibration_offset: float
+    :return: the score and beat stats, the same as `Score.get_stats()`.
+    """
+    return simulate_game(chart, bot, app, calibration_offset).get_score().get_stats()
+
+
+if __name__ == '__main__':
+    # plays every chart given with the autoplay bot, e.g. `python simulation.py Charts/*.chart`
+    headless_app = HeadlessApp()
+    for path in sys.argv[1:] or [CHART_PATH / 'pulsar.chart']:
+        loaded_chart = load_chart(Path(path))
+        start = time.perf_counter()
+        score, beat_stats = simulate(loaded_chart, AutoplayBot(), headless_app)
+        elapsed = time.perf_counter() - start
+        song_length = (loaded_chart.timestamps[-1] - loaded_chart.timestamps[0]) / 1000
+        print(f"{path}: score {score}, {beat_stats}, {song_length:.0f}s played in {elapsed * 1000:.1f}ms "
+              f"({song_length / elapsed:.0f}x real time)")
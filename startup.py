@@ -0,0 +1,88 @@
+import sys
+import threading
+import time
+
+
+class StartupTrace:
+    def __init__(self, enabled: bool = False) -> None:
+        """
+        Initializes a trace of how long each part of starting the game takes, from launch until the first frame of the
+        title screen is shown. Nothing is timed unless it is enabled, so the trace can be passed around either way.
+
+        This module doesn't import pygame, so the trace can be started before anything slow is imported.
+
+        :param enabled: whether to time anything
+        :type enabled: bool
+        """
+        self.__enabled = enabled
+        self.__start = time.perf_counter()
+        self.__last = self.__start
+        # (phase, thread, start, end) in seconds since the trace started
+        self.__phases = []
+        self.__lock = threading.Lock()
+        self.__finished = False
+
+    def mark(self, phase: str) -> None:
+        """
+        Ends a phase on the main thread, it's timed from the end of the one before it.
+
+        :param phase: name of the phase
+        :type phase: str
+        """
+        if not self.__enabled:
+            return
+        now = time.perf_counter()
+        self.__add(phase, "main", self.__last, now)
+        self.__last = now
+
+    def run_in_background(self, phase: str, task) -> threading.Thread:
+        """
+        Runs part of starting up on a thread of its own, so the title screen doesn't wait for it, timing it if the
+        trace is enabled.
+
+        :param phase: name of the phase
+        :type phase: str
+        :param task: function to run
+        :type task: Callable[[], None]
+        :return: the thread, already started.
+        """
+        def run() -> None:
+            started = time.perf_counter()
+            task()
+            if self.__enabled:
+                self.__add(phase, "background", started, time.perf_counter())
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+    def finish(self) -> None:
+        """
+        Marks the first frame as shown and prints the trace, only the first time it's called.
+        """
+        if not self.__enabled or self.__finished:
+            return
+        self.mark("first frame")
+        self.__finished = True
+        with self.__lock:
+            phases = sorted(self.__phases, key=lambda phase: phase[2])
+        print(f"{'phase':<24} {'thread':<10} {'start ms':>9} {'took ms':>9}", file=sys.stderr)
+        for phase, thread, start, end in phases:
+            print(f"{phase:<24} {thread:<10} {start * 1000:9.1f} {(end - start) * 1000:9.1f}", file=sys.stderr)
+        print(f"first frame shown after {(self.__last - self.__start) * 1000:.1f}ms", file=sys.stderr)
+
+    def __add(self, phase: str, thread: str, start: float, end: float) -> None:
+        """
+        Records a phase, from either thread.
+
+        :param phase: name of the phase
+        :type phase: str
+        :param thread: "main" or "background"
+        :type thread: str
+        :param start: when the phase started, from `time.perf_counter()`
+        :type start: float
+        :param end: when the phase ended, from `time.perf_counter()`
+        :type end: float
+        """
+        with self.__lock:
+            self.__phases.append((phase, thread, start - self.__start, end - self.__start))
@@ -0,0 +1,105 @@
+import threading
+
+import pygame
+
+
+class CachedText:
+    def __init__(self, font: pygame.font.Font, template: str, colour: tuple) -> None:
+        """
+        Initializes a line of text whose rendered surface is reused until the values shown in it change.
+
+        :param font: the font the text is rendered with
+        :type font: pygame.font.Font
+        :param template: `str.format` template the values are substituted into, e.g. "Score: {}"
+        :type template: str
+        :param colour: the colour of the text (Red, Green, Blue)
+        :type colour: tuple
+        """
+        self.__font = font
+        self.__template = template
+        self.__colour = colour
+        self.__values = None
+        self.__surface = None
+
+    def get_surface(self, *values) -> pygame.Surface:
+        """
+        Returns the rendered text for the given values. The text is only formatted and rendered again when the values
+        are different from the ones the last surface was rendered with.
+
+        :param values: the values substituted into the template
+        :return: the surface containing the rendered text.
+        """
+        if self.__surface is None or values != self.__values:
+            self.__surface = self.__font.render(self.__template.format(*values), True, self.__colour)
+            self.__values = values
+        return self.__surface
+
+    def draw(self, window: pygame.Surface, position: tuple, *values) -> None:
+        """
+        Blits the text for the given values onto the window.
+
+        :param window: the surface the text is drawn on
+        :type window: pygame.Surface
+        :param position: the x and y coordinates to display the text
+        :type position: tuple
+        :param values: the values substituted into the template
+        """
+        window.blit(self.get_surface(*values), position)
+
+
+class FontCache:
+    def __init__(self) -> None:
+        """
+        Initializes an empty cache of fonts. Looking up a system font scans every font installed, so each font is only
+        looked up once and shared by everything that uses it.
+        """
+        self.__fonts = {}
+        # held while the system fonts are scanned in the background
+        self.__scanning = threading.Lock()
+        self.__scanned = threading.Event()
+
+    def scan(self) -> None:
+        """
+        Scans the system fonts ahead of time, meant to be run in the background while the game starts. Fonts asked for
+        in the meantime wait for the scan rather than scanning again.
+        """
+        with self.__scanning:
+            if not pygame.font.get_init():
+                pygame.font.init()
+            pygame.font.get_fonts()
+        self.__scanned.set()
+
+    def is_scanned(self) -> bool:
+        """
+        Checks if the system fonts have been scanned, without waiting for the scan.
+
+        :return: `True` if fonts can be looked up straight away.
+        """
+        return self.__scanned.is_set()
+
+    def get_font(self, name: str, size: int) -> pygame.font.Font:
+        """
+        Returns the system font with the given name and size, loading it the first time it is asked for.
+
+        :param name: name of the system font
+        :type name: str
+        :param size: size of the font
+        :type size: int
+        :return: the font.
+        """
+        key = (name, size)
+        font = self.__fonts.get(key)
+        if font is None:
+            with self.__scanning:
+                # fonts are only started when the first one is needed
+                if not pygame.font.get_init():
+                    pygame.font.init()
+                font = pygame.font.SysFont(name, size)
+            # looking a font up scans the system fonts too
+            self.__scanned.set()
+            self.__fonts[key] = font
+        return font
+
+
+# process-wide cache, fonts are kept between rounds
+font_cache = FontCache()
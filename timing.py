@@ -0,0 +1,59 @@
+import time
+
+import pygame
+
+# one note length unit lasts a quarter of a second, the speed the player used to move at (6px a frame at 60fps) across
+# one 90px beat
+BPM = 240
+# the most times faster than usual the player can be asked to move, charts that need more are unplayable
+MAX_SPEED = 1.5
+
+# hits are judged by how long before the note's time the space bar is pressed, these match the old pixel windows
+# (30px for a perfect hit, 100px for the player to be overlapping the beat) at the old player speed of 360px/s
+PERFECT_WINDOW_MS = 83
+GOOD_WINDOW_MS = 278
+
+# how far the monotonic clock is allowed to drift from the mixer's position before it is pulled back in line
+MAX_DRIFT_MS = 30
+
+
+class SongClock:
+    def __init__(self, use_mixer: bool = True, speed: float = 1.0) -> None:
+        """
+        Initializes a clock that measures the position in the song in milliseconds.
+
+        :param use_mixer: whether the clock should follow `pygame.mixer.music.get_pos()` while music is playing. If
+        `False`, or the mixer is not playing, the clock only uses the monotonic system clock
+        :type use_mixer: bool
+        :param speed: how fast the song's time passes compared to real time, e.g. to play back a replay faster. The
+        mixer can't be followed unless this is 1
+        :type speed: float
+        """
+        self.__use_mixer = use_mixer and speed == 1
+        self.__speed = speed
+        self.__start = None
+
+    def start(self) -> None:
+        """
+        Starts the clock from 0, should be called at the same time the song starts playing.
+        """
+        self.__start = time.perf_counter()
+
+    def get_time(self) -> float:
+        """
+        Calculates the current position in the song.
+
+        The mixer's position only moves on once per audio buffer, so the smooth monotonic clock is used for the time and
+        it is only corrected when it drifts too far from the mixer.
+
+        :return: the number of milliseconds since the clock was started, or 0 if it has not been started.
+        """
+        if self.__start is None:
+            return 0.0
+        song_time = (time.perf_counter() - self.__start) * 1000 * self.__speed
+        if self.__use_mixer and pygame.mixer.get_init() and pygame.mixer.music.get_busy():
+            mixer_time = pygame.mixer.music.get_pos()
+            if mixer_time >= 0 and abs(mixer_time - song_time) > MAX_DRIFT_MS:
+                self.__start = time.perf_counter() - mixer_time / 1000
+                song_time = float(mixer_time)
+        return song_time
@@ -1,9 +1,11 @@
-from sys import exit
+from typing import TYPE_CHECKING
 
 import math
 import pygame
 
-from main import Score
+from assets import asset_cache
+from scores import TOP_SCORES
+from text_cache import CachedText, font_cache
 from pathlib import Path
 
 """
@@ -11,82 +13,230 @@ Mintlify Doc Writer used to help write function docstrings
 https://writer.mintlify.com/
 """
 
+if TYPE_CHECKING:
+    from app import App
+    from preload import SongLoader
+    from scores import ScoreQuery
+
 UI_PATH = Path("./UI")
 
 
+def angle_to_colour(angle: int) -> tuple:
+    """
+    Converts an angle in degrees to a colour in RGB, going round the colour wheel as the angle increases
+
+    :param angle: The `angle` parameter represents an angle in degrees
+    :type angle: int
+    :return: the colour (Red, Green, Blue).
+    """
+    # Calculate the value of each colour channel from the angle
+    red = 256 * math.cos(math.radians(angle)) + 128
+    green = 256 * math.cos(math.radians(angle - 120)) + 128
+    blue = 256 * math.cos(math.radians(angle - 240)) + 128
+    return tuple(int(min(max(channel, 0), 255)) for channel in (red, green, blue))
+
+
+# the background cycles through these every frame, so the colour for every whole degree is worked out once up front
+HUE_COLOURS = [angle_to_colour(angle) for angle in range(360)]
+
+
 class GuiManager:
-    def __init__(self, stats: tuple = None) -> None:
+    def __init__(self, app: "App", stats: tuple = None, loader: "SongLoader" = None,
+                 high_scores: "ScoreQuery" = None) -> None:
         """
-        Initializes a Pygame window and sets up various game elements such as the
-        background, start prompt, and space bar image.
+        Sets up various game elements such as the background, start prompt, and space bar image on the app's window.
+
+        :param app: the app that owns the window and clock
+        :type app: App
+        :param stats: the score and beat stats from the last round, shown if given
+        :type stats: tuple (optional)
+        :param loader: loader for the next song, which runs in the background while the title screen is shown
+        :type loader: SongLoader (optional)
+        :param high_scores: the high scores for the song that was just played, shown with its results once they have
+        been looked up
+        :type high_scores: ScoreQuery (optional)
         """
-        pygame.init()
-        self.__window = pygame.display.set_mode((810, 500))
-        pygame.display.set_caption('Rhythm Game')
-        self.__clock = pygame.time.Clock()
+        self.__app = app
+        self.__window = app.get_window()
+        self.__display = app.get_display()
+        self.__clock = app.get_clock()
+        self.__profiler = app.get_profiler()
 
         self.__bg_colour = 0
         self.__background = [Box(self.__window, x=i * 90, colour_shift=(i * 5) + self.__bg_colour) for i in range(9)]
 
         self.__press_start = Image(self.__window, UI_PATH / 'press_space.png', 249, 10, 4)
-        self.__space_bar = Image(self.__window, UI_PATH / 'space_bar_1.png', 249, 300, 9.8)
-        self.__frame_counter = 0
-        self.start_game = False
+        # the space bar is pressed down then released, each frame is shown for 2 ticks
+        space_bar_frames = [UI_PATH / 'space_bar_1.png', UI_PATH / 'space_bar_2.png',
+                            UI_PATH / 'space_bar_3.png', UI_PATH / 'space_bar_2.png']
+        self.__space_bar = Animation(self.__window, space_bar_frames, 249, 300, 9.8, 2)
+
+        self.__loader = loader
+        self.__start_pressed = False
+        # the song select only reads the library's index, the picked song is loaded when space is pressed
+        self.__songs = app.get_library().get_songs()
+        self.__stats = stats
+        self.__high_scores = high_scores
+        # the text is made once the system fonts have been scanned, see `__make_text`
+        self.__has_text = False
+
+    def __make_text(self) -> None:
+        """
+        Makes the title screen's text. Looking up a font waits for the system fonts to be scanned in the background, so
+        this is only done once the scan has finished and the first frames are shown without text.
+        """
+        status_font = font_cache.get_font("monospace", 20)
+        self.__loading_text = CachedText(status_font, "Loading song {}%", (0, 0, 0))
+        self.__error_text = CachedText(status_font, "{}", (252, 73, 73))
+        self.__calibrate_text = CachedText(status_font, "Press C to calibrate", (0, 0, 0))
+
+        self.__song_text = CachedText(status_font, "< {} >", (0, 0, 0))
+        self.__song_details = CachedText(status_font, "{}:{:02d}  {:.0f} bpm  {} notes  difficulty {:.1f}  ({}/{})",
+                                         (0, 0, 0))
 
         self.__score = None
-        if stats is not None:
-            (score, beat_stats) = stats
+        if self.__stats is not None:
+            # there are only results once a game has been played, so the game is already imported
+            from main import Score
+            (score, beat_stats) = self.__stats
             self.__score = Score(self.__window, 30, score, beat_stats)
 
-    def gui_loop(self) -> None:
+        self.__best_text = CachedText(status_font, "Personal best: {}", (0, 0, 0))
+        self.__top_title = CachedText(status_font, "Top scores", (0, 0, 0))
+        self.__top_text = [CachedText(status_font, "{}. {:<10} {:>5}", (0, 0, 0)) for _ in range(TOP_SCORES)]
+        self.__has_text = True
+
+    def gui_loop(self) -> str:
         """
-        The function `gui_loop` is a continuous loop that handles events, updates the GUI, and checks for the space bar key
-        press to start the game.
-        :return: The `start_game` variable is being returned.
+        The function `gui_loop` is a continuous loop that handles events, updates the GUI, and waits for the space bar to
+        be pressed to start the game. If the next song is still loading when space is pressed, the game starts as soon as
+        it has loaded.
+        :return: the scene to switch to, "game" once space has been pressed, "calibration" if C is pressed or "quit" if
+        the window is closed.
         """
         while True:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    exit()
+            self.__profiler.begin_frame()
+            next_scene = self.handle_events()
+            if next_scene is not None:
+                return next_scene
+            self.__profiler.mark("input")
 
-            self.__window.fill((255, 255, 255))
+            self.draw()
+            # does nothing after the first frame the game shows
+            self.__app.finish_startup()
+            if self.__loader is None:
+                # the song that's selected is the one most likely to be played next, it's loaded once the screen is up
+                self.__loader = self.__app.load_song(self.__app.get_selected_chart())
+            self.__clock.tick(60)
+            self.__profiler.mark("tick")
+            self.__profiler.end_frame()
 
-            for beat in range(9):
-                self.__background[beat].set_colour((beat * 5) + self.__bg_colour)
-                self.__background[beat].draw()
-            self.__press_start.draw()
+    def handle_events(self) -> str:
+        """
+        Handles the events since the last frame and checks on the song loading in the background.
+        :return: the scene to switch to, or `None` to stay on the title screen.
+        """
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return "quit"
+            # reacting to the key press event means a tap between frames still counts
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
+                self.__start_pressed = True
+                self.__loader = self.__app.load_song(self.__app.get_selected_chart())
+            elif event.type == pygame.KEYDOWN and event.key in (pygame.K_LEFT, pygame.K_RIGHT, pygame.K_UP,
+                                                                pygame.K_DOWN) and self.__songs:
+                # picking another song while one is loading is allowed, the new one is loaded when space is pressed
+                step = -1 if event.key in (pygame.K_LEFT, pygame.K_UP) else 1
+                self.__app.select_song((self.__app.get_selected() + step) % len(self.__songs))
+                self.__start_pressed = False
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                self.__profiler.toggle_overlay()
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_c and not self.__start_pressed:
+                return "calibration"
+
+        if self.__loader is not None:
+            self.__loader.poll()
+        if self.__start_pressed and self.__loader.is_done():
+            if self.__loader.get_song() is not None:
+                return "game"
+            # the error is shown until another song is picked
+            self.__start_pressed = False
+        return None
+
+    def draw(self) -> None:
+        """
+        Draws one frame of the title screen, moves its animations on and updates the display.
+        """
+        # the background boxes cover the whole window, so it doesn't need clearing first
+        for beat in range(9):
+            self.__background[beat].set_colour((beat * 5) + self.__bg_colour)
+            self.__background[beat].draw()
+        self.__profiler.mark("background")
+        self.__press_start.draw()
+        self.__profiler.mark("images")
 
+        if not self.__has_text and font_cache.is_scanned():
+            self.__make_text()
+        if self.__has_text:
             if self.__score is not None:
                 self.__score.write_score((320, 150))
                 self.__score.write_beat_stats((140, 200))
+            if self.__high_scores is not None and self.__high_scores.is_done():
+                self.__draw_high_scores()
+            if self.__songs:
+                self.__draw_song_select()
+        self.__profiler.mark("score")
 
-            # Space bar animation
-            self.__frame_counter += 1
-            self.__frame_counter = self.__frame_counter % 8
-            match self.__frame_counter:
-                case 0:
-                    self.__space_bar._source = UI_PATH / 'space_bar_1.png'
-                case 2:
-                    self.__space_bar._source = UI_PATH / 'space_bar_2.png'
-                case 4:
-                    self.__space_bar._source = UI_PATH / 'space_bar_3.png'
-                case 6:
-                    self.__space_bar._source = UI_PATH / 'space_bar_2.png'
-            self.__space_bar.draw()
-
-            # Background animation
-            self.__bg_colour += 1
-            self.__bg_colour = self.__bg_colour % 360
-
-            keys = pygame.key.get_pressed()
-
-            if keys[pygame.K_SPACE]:
-                self.start_game = True
-                return
-
-            pygame.display.update()
-            self.__clock.tick(60)
+        # Space bar animation
+        self.__space_bar.next_frame()
+        self.__space_bar.draw()
+
+        if self.__has_text:
+            if self.__loader is not None:
+                self.__draw_loading_status()
+            self.__calibrate_text.draw(self.__window,
+                                       (self.__window.get_width() - 250, self.__window.get_height() - 30))
+        self.__profiler.mark("images")
+
+        # Background animation
+        self.__bg_colour += 1
+        self.__bg_colour = self.__bg_colour % 360
+
+        self.__profiler.draw_overlay(self.__window)
+        self.__display.present()
+        self.__profiler.mark("display")
+
+    def __draw_song_select(self) -> None:
+        """
+        Shows the selected song and its details, between the start prompt and the last round's results.
+        """
+        selected = self.__app.get_selected()
+        song = self.__songs[selected]
+        minutes, seconds = divmod(round(song.duration), 60)
+        for text, y, values in ((self.__song_text, 105, (song.title,)),
+                                (self.__song_details, 125, (minutes, seconds, song.bpm, song.note_count,
+                                                            song.difficulty, selected + 1, len(self.__songs)))):
+            width = text.get_surface(*values).get_width()
+            text.draw(self.__window, ((self.__window.get_width() - width) // 2, y), *values)
+
+    def __draw_high_scores(self) -> None:
+        """
+        Shows the player's best score on the song that was just played and its top scores, under its results.
+        """
+        self.__best_text.draw(self.__window, (140, 240), self.__high_scores.get_best())
+        self.__top_title.draw(self.__window, (620, 280))
+        for place, (player, score) in enumerate(self.__high_scores.get_top()):
+            self.__top_text[place].draw(self.__window, (585, 305 + place * 22), place + 1, player[:10], score)
+
+    def __draw_loading_status(self) -> None:
+        """
+        Shows how much of the next song has loaded, or why it failed to load, in the bottom corner of the window.
+        """
+        position = (10, self.__window.get_height() - 30)
+        if self.__loader.get_error() is not None:
+            self.__error_text.draw(self.__window, position, self.__loader.get_error())
+        elif not self.__loader.is_done():
+            self.__loading_text.draw(self.__window, position, int(self.__loader.get_progress() * 100))
 
 
 class Box:
@@ -108,37 +258,19 @@ class Box:
         self._y = 0
         self._width = self._window.get_width() // 8
         self._height = self._window.get_height()
+        self._rect = pygame.Rect(self._x, self._y, self._width, self._height)
 
     def draw(self) -> None:
-        rect = pygame.Rect(self._x, self._y, self._width, self._height)
-        pygame.draw.rect(self._window, self._colour, rect)
+        self._window.fill(self._colour, self._rect)
 
     def set_colour(self, angle: int) -> None:
         """
-        Converts an angle in degrees to a colour in RGB for the colour
+        Converts an angle in degrees to a colour in RGB for the colour, using the precalculated colour wheel
 
         :param angle: The `angle` parameter represents an angle in degrees
         :type angle: int
         """
-
-        # Calculate the value of each colour channel from the angle
-        red = 256 * math.cos(math.radians(angle)) + 128
-        green = 256 * math.cos(math.radians(angle - 120)) + 128
-        blue = 256 * math.cos(math.radians(angle - 240)) + 128
-        if red > 255:
-            red = 255
-        elif red < 0:
-            red = 0
-        if green > 255:
-            green = 255
-        elif green < 0:
-            green = 0
-        if blue > 255:
-            blue = 255
-        elif blue < 0:
-            blue = 0
-
-        self._colour = (red, green, blue)
+        self._colour = HUE_COLOURS[int(angle) % 360]
 
 
 class Image:
@@ -166,9 +298,46 @@ class Image:
 
     def draw(self) -> None:
         """
-        The `draw` function loads an image, scales it based on a given scale factor, and then blits it onto a window at a
-        specified position.
+        The `draw` function blits the image onto the window at its position. The image is only loaded and scaled the
+        first time it is drawn, after that the scaled surface comes from the asset cache.
+        """
+        self._window.blit(asset_cache.get_image(self._source, self._scale), (self._x, self._y))
+
+
+class Animation(Image):
+    def __init__(self, window: pygame.Surface, sources: list, x: int, y: int, scale: float = 1.0,
+                 frame_length: int = 1) -> None:
+        """
+        The function initializes an image that cycles through a list of frames.
+
+        :param window: pygame Surface object on which the animation will be displayed
+        :type window: pygame.Surface
+        :param sources: list of pathlib Paths of the image files for each frame, in the order they are shown
+        :type sources: list
+        :param x: the x-coordinate of the object's position on the window
+        :type x: int
+        :param y: the y-coordinate of the object's position on the window
+        :type y: int
+        :param scale: scaling factor applied to every frame
+        :type scale: float
+        :param frame_length: number of ticks each frame is shown for before moving on to the next one
+        :type frame_length: int
+        """
+        super().__init__(window, sources[0], x, y, scale)
+        self._sources = sources
+        self._frame_length = frame_length
+        self._tick = 0
+
+    def next_frame(self) -> None:
+        """
+        Advances the animation by one tick, wrapping back to the first frame after the last one.
+        """
+        self._tick = (self._tick + 1) % (len(self._sources) * self._frame_length)
+
+    def draw(self) -> None:
+        """
+        The `draw` function blits the current frame onto the window. Each frame is fetched from the asset cache every
+        time it is drawn, so the cache's memory cap applies to the frames too.
         """
-        img = pygame.image.load(self._source)
-        img = pygame.transform.scale(img, (img.get_width() * self._scale, img.get_height() * self._scale))
-        self._window.blit(img, (self._x, self._y))
+        source = self._sources[self._tick // self._frame_length]
+        self._window.blit(asset_cache.get_image(source, self._scale), (self._x, self._y))
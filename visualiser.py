@@ -0,0 +1,200 @@
+import struct
+import sys
+from pathlib import Path
+
+# numpy is only needed to analyse songs and read the results, without it the beats just keep their colours
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# the analysis has a row for every 60th of a second of the song
+FRAMES_PER_SECOND = 60
+# samples in each window the spectrum is worked out over
+WINDOW_SIZE = 2048
+# frequency bands, in Hz, the spectrum is split into, bass first
+BAND_EDGES = (20, 120, 300, 900, 3000, 20000)
+BAND_COUNT = len(BAND_EDGES) - 1
+# windows analysed at once, to keep memory use down for long songs
+BLOCK_SIZE = 1024
+# the levels are scaled so this percentile of each column is the loudest, a few peaks don't flatten everything else
+LOUDEST_PERCENTILE = 99
+
+
+def get_envelope_path(audio_path: Path) -> Path:
+    """
+    Works out where a song's analysis is cached, next to its audio.
+
+    :param audio_path: file path of the song's audio
+    :type audio_path: Path
+    :return: file path of the analysis.
+    """
+    return audio_path.with_name(f"{audio_path.stem}.envelope.npy")
+
+
+def is_envelope_current(audio_path: Path) -> bool:
+    """
+    Checks if a song's cached analysis exists and is newer than its audio.
+
+    :param audio_path: file path of the song's audio
+    :type audio_path: Path
+    :return: `True` if the analysis can be used.
+    """
+    envelope_path = get_envelope_path(audio_path)
+    return envelope_path.exists() and envelope_path.stat().st_mtime >= audio_path.stat().st_mtime
+
+
+def read_wav(audio_path: Path, mono: bool = True) -> tuple:
+    """
+    Reads a WAV file's samples. They are memory mapped rather than read in, so only the parts of the song being used are
+    loaded.
+
+    :param audio_path: file path of the WAV file
+    :type audio_path: Path
+    :param mono: whether to mix the samples down to mono floats between -1 and 1, which loads the whole song, rather
+    than leave them as they are in the file so they can be read a block at a time with `to_mono`
+    :type mono: bool
+    :return: the samples, with a column for each channel if they aren't mixed down, and the sample rate.
+    """
+    with open(audio_path, "rb") as file:
+        riff, _, wave_id = struct.unpack("<4sI4s", file.read(12))
+        if riff != b"RIFF" or wave_id != b"WAVE":
+            raise ValueError(f"{audio_path.name} is not a WAV file")
+        channels = sample_rate = sample_width = None
+        while chunk := file.read(8):
+            if len(chunk) < 8:
+                break
+            chunk_id, size = struct.unpack("<4sI", chunk)
+            if chunk_id == b"fmt ":
+                audio_format, channels, sample_rate, _, _, bits = struct.unpack("<HHIIHH", file.read(16))
+                if audio_format not in (1, 0xFFFE):
+                    raise ValueError(f"{audio_path.name} is compressed, only PCM WAV files can be read")
+                sample_width = bits // 8
+                file.seek(size - 16 + size % 2, 1)
+            elif chunk_id == b"data":
+                if channels is None:
+                    raise ValueError(f"{audio_path.name} has no format chunk")
+                dtype = {1: np.uint8, 2: "<i2", 4: "<i4"}.get(sample_width)
+                if dtype is None:
+                    raise ValueError(f"{sample_width * 8} bit WAV files can't be read")
+                frames = size // (sample_width * channels)
+                samples = np.memmap(audio_path, dtype, "r", offset=file.tell(), shape=(frames, channels))
+                return (to_mono(samples) if mono else samples), sample_rate
+            else:
+                # chunks are padded to an even length
+                file.seek(size + size % 2, 1)
+    raise ValueError(f"{audio_path.name} has no audio")
+
+
+def to_mono(block) -> "np.ndarray":
+    """
+    Mixes a block of samples down to mono, as floats between -1 and 1.
+
+    :param block: samples with a column for each channel
+    :type block: numpy.ndarray
+    :return: the mono samples.
+    """
+    scale = {np.dtype(np.uint8): 128, np.dtype("<i2"): 32768, np.dtype("<i4"): 2147483648}[block.dtype]
+    mono = block.mean(axis=1, dtype=np.float32)
+    if block.dtype == np.uint8:
+        mono -= 128
+    return mono / scale
+
+
+def analyse(samples, sample_rate: int):
+    """
+    Works out how loud a song is, overall and in each frequency band, for every frame of the song.
+
+    :param samples: the song's samples, mono, between -1 and 1
+    :type samples: numpy.ndarray
+    :param sample_rate: samples per second
+    :type sample_rate: int
+    :return: an array with a row for each frame, the loudness (RMS) then the energy of each band, each scaled from 0
+    to 255.
+    """
+    frame_count = int(len(samples) * FRAMES_PER_SECOND / sample_rate) + 1
+    # each window is centred on its frame's time
+    padded = np.pad(samples, WINDOW_SIZE // 2)
+    windows = np.lib.stride_tricks.sliding_window_view(padded, WINDOW_SIZE)
+    starts = np.round(np.arange(frame_count) * sample_rate / FRAMES_PER_SECOND).astype(np.int64)
+    starts = np.minimum(starts, len(windows) - 1)
+
+    taper = np.hanning(WINDOW_SIZE).astype(np.float32)
+    frequencies = np.fft.rfftfreq(WINDOW_SIZE, 1 / sample_rate)
+    band_starts = np.searchsorted(frequencies, BAND_EDGES[:-1])
+    band_ends = np.searchsorted(frequencies, BAND_EDGES[1:])
+
+    levels = np.empty((frame_count, 1 + BAND_COUNT), np.float32)
+    for block in range(0, frame_count, BLOCK_SIZE):
+        frames = windows[starts[block:block + BLOCK_SIZE]]
+        levels[block:block + len(frames), 0] = np.sqrt(np.mean(frames ** 2, axis=1))
+        power = np.abs(np.fft.rfft(frames * taper, axis=1)) ** 2
+        # running totals make each band's sum a single subtraction
+        totals = np.concatenate((np.zeros((len(frames), 1)), np.cumsum(power, axis=1, dtype=np.float64)), axis=1)
+        levels[block:block + len(frames), 1:] = totals[:, band_ends] - totals[:, band_starts]
+
+    # the bands are heard on a log scale, then everything is scaled to fit in a byte
+    levels[:, 1:] = np.log1p(levels[:, 1:])
+    loudest = np.percentile(levels, LOUDEST_PERCENTILE, axis=0)
+    loudest[loudest == 0] = 1
+    return np.clip(levels / loudest * 255, 0, 255).astype(np.uint8)
+
+
+def build_envelope(audio_path: Path) -> Path:
+    """
+    Analyses a song and caches the result next to its audio, if it hasn't been already.
+
+    :param audio_path: file path of the song's audio
+    :type audio_path: Path
+    :return: file path of the analysis.
+    """
+    envelope_path = get_envelope_path(audio_path)
+    if not is_envelope_current(audio_path):
+        np.save(envelope_path, analyse(*read_wav(audio_path)))
+    return envelope_path
+
+
+class Envelope:
+    def __init__(self, levels) -> None:
+        """
+        Initializes a song's analysis, which is read straight from the file as it is needed rather than loaded up
+        front.
+
+        :param levels: the analysis, from `analyse`
+        :type levels: numpy.ndarray
+        """
+        self.__levels = levels
+
+    def get_levels(self, song_time: float):
+        """
+        Looks up how loud the song is at a point in it.
+
+        :param song_time: the position in the song in milliseconds
+        :type song_time: float
+        :return: the loudness then the energy of each band, bass first, each from 0 to 255. `None` outside the song.
+        """
+        frame = int(song_time * FRAMES_PER_SECOND / 1000)
+        if frame < 0 or frame >= len(self.__levels):
+            return None
+        return self.__levels[frame]
+
+
+def load_envelope(audio_path: Path) -> Envelope:
+    """
+    Opens a song's cached analysis.
+
+    :param audio_path: file path of the song's audio
+    :type audio_path: Path
+    :return: the analysis, or `None` if numpy isn't installed or the song hasn't been analysed since its audio changed.
+    """
+    if np is None or not audio_path.exists() or not is_envelope_current(audio_path):
+        return None
+    return Envelope(np.load(get_envelope_path(audio_path), mmap_mode="r"))
+
+
+if __name__ == '__main__':
+    # analyses every song given ahead of time, e.g. `python visualiser.py Audio/*.wav`
+    if np is None:
+        sys.exit("numpy is needed to analyse songs")
+    for path in sys.argv[1:]:
+        print(f"{path} -> {build_envelope(Path(path))}")